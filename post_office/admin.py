@@ -16,9 +16,9 @@ from django.utils.text import Truncator
 from django.utils.translation import gettext_lazy as _
 
 from .fields import CommaSeparatedEmailField
-from .models import STATUS, Attachment, Email, EmailTemplate, Log
+from .models import STATUS, ArchivedEmail, ArchivedLog, Attachment, Email, EmailTemplate, Log, Recipient
 from .sanitizer import clean_html
-from .settings import PRE_DJANGO_6
+from .settings import PRE_DJANGO_6, get_store_recipients
 
 
 @admin.display(description='Message')
@@ -65,6 +65,18 @@ class LogInline(admin.TabularInline):
         return False
 
 
+class RecipientInline(admin.TabularInline):
+    model = Recipient
+    readonly_fields = fields = ['address', 'kind', 'delivery_status']
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 class CommaSeparatedEmailWidget(TextInput):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -97,8 +109,14 @@ class EmailAdmin(admin.ModelAdmin):
         'use_template',
     ]
     search_fields = ['to', 'subject']
-    readonly_fields = ['message_id', 'render_subject', 'render_plaintext_body', 'render_html_body']
-    inlines = [AttachmentInline, LogInline]
+    readonly_fields = [
+        'message_id',
+        'provider_message_id',
+        'render_subject',
+        'render_plaintext_body',
+        'render_html_body',
+    ]
+    inlines = [AttachmentInline, RecipientInline, LogInline]
     list_filter = ['status', 'template__language', 'template__name']
     formfield_overrides = {CommaSeparatedEmailField: {'widget': CommaSeparatedEmailWidget}}
     actions = [requeue]
@@ -118,6 +136,12 @@ class EmailAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('template')
 
+    def get_search_results(self, request, queryset, search_term):
+        if get_store_recipients() and '@' in search_term and len(search_term.split()) == 1:
+            # An index seek instead of scanning the to field
+            return queryset.filter(recipients__address=Recipient.normalize_address(search_term)), False
+        return super().get_search_results(request, queryset, search_term)
+
     @admin.display(
         description=_('To'),
         ordering='to',
@@ -174,6 +198,8 @@ class EmailAdmin(admin.ModelAdmin):
 
     def get_fieldsets(self, request, obj=None):
         fields = ['from_email', 'to', 'cc', 'bcc', 'priority', ('status', 'scheduled_time')]
+        if obj.provider_message_id:
+            fields.insert(0, 'provider_message_id')
         if obj.message_id:
             fields.insert(0, 'message_id')
         fieldsets = [(None, {'fields': fields})]
@@ -331,3 +357,42 @@ class AttachmentAdmin(admin.ModelAdmin):
     filter_horizontal = ['emails']
     search_fields = ['name']
     autocomplete_fields = ['emails']
+
+
+class ArchivedLogInline(admin.TabularInline):
+    model = ArchivedLog
+    readonly_fields = fields = ['date', 'status', 'exception_type', 'message']
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedEmail)
+class ArchivedEmailAdmin(admin.ModelAdmin):
+    list_display = ['id', 'to_display', 'shortened_subject', 'status', 'last_updated', 'archived_at']
+    search_fields = ['to', 'subject', 'message_id']
+    list_filter = ['status']
+    date_hierarchy = 'last_updated'
+    inlines = [ArchivedLogInline]
+    exclude = ['attachments']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('template')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description=_('To'), ordering='to')
+    def to_display(self, instance):
+        return ', '.join(instance.to)
+
+    @admin.display(description=_('Subject'), ordering='subject')
+    def shortened_subject(self, instance):
+        return Truncator(instance.subject).chars(100)
@@ -0,0 +1,191 @@
+"""
+The asyncio sending engine, used by ``send_queued_mail`` when ``SENDING_ENGINE``
+is ``'asyncio'``. Emails are still claimed, prepared and updated in the calling
+thread; only their delivery runs on an event loop, so a single process can have
+hundreds of deliveries in flight over backends that implement ``asend_messages()``.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from multiprocessing import TimeoutError
+from typing import Optional
+
+from django.core.mail import get_connection
+from django.utils.module_loading import import_string
+
+from .backends import apply_send_results
+from .logutils import setup_loghandlers
+from .models import Email
+from .ratelimit import await_rate_limit
+from .settings import get_backend
+
+logger = setup_loghandlers('INFO')
+
+
+def is_async_backend(alias: str) -> bool:
+    """
+    Returns True if the backend configured for ``alias`` can be used by the
+    asyncio engine, i.e. implements ``async def asend_messages(email_messages)``.
+    """
+    return hasattr(import_string(get_backend(alias)), 'asend_messages')
+
+
+async def send_email_async(email: Email, log_level: int) -> tuple[bool, Optional[Exception]]:
+    """
+    The asyncio counterpart of ``mail._send_email()``, ``email`` must already be prepared.
+    """
+    try:
+        alias = email.backend_alias or 'default'
+        await await_rate_limit(alias)
+        connection = _get_connection(alias)
+        await connection.asend_messages([email.email_message()])
+        logger.debug(f'Successfully sent email #{email.id}')
+        return True, None
+    except asyncio.CancelledError:
+        # Timed out, see SEND_TIMEOUT
+        await _discard_connection(alias)
+        raise
+    except Exception as e:
+        logger.exception(f'Failed to send email #{email.id}')
+        return False, e
+    finally:
+        # Release the prepared message (and its attachments) as soon as it's sent
+        email._cached_email_message = None
+
+
+async def send_emails_async(emails: list[Email], log_level: int) -> list[tuple[bool, Optional[Exception]]]:
+    """
+    The asyncio counterpart of ``mail._send_emails()``, uses ``asend_batch()`` if the backend implements it.
+    """
+    alias = emails[0].backend_alias or 'default'
+    try:
+        for _ in emails:
+            await await_rate_limit(alias)
+        connection = _get_connection(alias)
+        email_messages = [email.email_message() for email in emails]
+        if not hasattr(connection, 'asend_batch'):
+            await connection.asend_messages(email_messages)
+            logger.debug(f'Successfully sent emails {", ".join(f"#{email.id}" for email in emails)}')
+            return [(True, None)] * len(emails)
+        return apply_send_results(emails, await connection.asend_batch(email_messages))
+    except asyncio.CancelledError:
+        await _discard_connection(alias)
+        raise
+    except Exception as e:
+        logger.exception(f'Failed to send emails {", ".join(f"#{email.id}" for email in emails)}')
+        return [(False, e)] * len(emails)
+    finally:
+        for email in emails:
+            email._cached_email_message = None
+
+
+async def run_task_async(task, send, *args):
+    """
+    The asyncio counterpart of ``mail._run_task()``.
+    """
+    task.started_at = time.monotonic()
+    return await send(*args)
+
+
+async def _discard_connection(alias: str) -> None:
+    # The connection may be stuck halfway through a send, later deliveries get a new one
+    connection = _loop_connections.get(asyncio.get_running_loop(), {}).pop(alias, None)
+    if connection is None:
+        return
+    try:
+        if hasattr(connection, 'aclose'):
+            await connection.aclose()
+        else:
+            connection.close()
+    except Exception:
+        pass
+
+
+def _get_connection(alias: str):
+    # Connections are opened lazily and shared by all deliveries on the running loop
+    connections = _loop_connections.setdefault(asyncio.get_running_loop(), {})
+    if alias not in connections:
+        connections[alias] = get_connection(get_backend(alias))
+    return connections[alias]
+
+
+_loop_connections = {}
+
+
+class AsyncResult:
+    def __init__(self, future: concurrent.futures.Future):
+        self.future = future
+
+    def ready(self) -> bool:
+        return self.future.done()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        concurrent.futures.wait([self.future], timeout=timeout)
+
+    def cancel(self) -> None:
+        self.future.cancel()
+
+    def get(self, timeout: Optional[float] = None):
+        try:
+            return self.future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            raise TimeoutError(f'Email was not sent within {timeout} seconds')
+
+
+class AsyncioPool:
+    """
+    Runs coroutine functions on an event loop in a background thread. Offers the
+    parts of ``multiprocessing.pool.ThreadPool``'s interface used by ``_send_bulk()``,
+    so that emails are sent the same way by threads or by the event loop.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='post_office-asyncio', daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def apply_async(self, func, args=(), callback=None) -> AsyncResult:
+        future = asyncio.run_coroutine_threadsafe(func(*args), self.loop)
+        if callback is not None:
+
+            def done(future):
+                if not future.cancelled() and future.exception() is None:
+                    callback(future.result())
+
+            future.add_done_callback(done)
+        return AsyncResult(future)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Cancels deliveries that are still running, e.g. after a timeout, closes
+        the connections opened on the loop and stops it.
+        """
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout=timeout)
+        except Exception:
+            logger.exception('Failed to close asyncio connections')
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+
+    async def _shutdown(self) -> None:
+        current_task = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current_task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for connection in _loop_connections.pop(self.loop, {}).values():
+            if hasattr(connection, 'aclose'):
+                await connection.aclose()
+            else:
+                connection.close()
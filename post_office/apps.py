@@ -8,9 +8,11 @@ class PostOfficeConfig(AppConfig):
     default_auto_field = 'django.db.models.AutoField'
 
     def ready(self):
-        from post_office import tasks
-        from post_office.settings import get_celery_enabled
+        from post_office import notify, tasks
+        from post_office.settings import get_celery_enabled, get_notify_enabled
         from post_office.signals import email_queued
 
         if get_celery_enabled():
             email_queued.connect(tasks.queued_mail_handler)
+        if get_notify_enabled():
+            email_queued.connect(notify.notify_email_queued)
@@ -1,8 +1,69 @@
 from collections import OrderedDict
+from dataclasses import dataclass
 from email.mime.base import MIMEBase
+from typing import Optional
+
+from django.conf import settings
 from django.core.files.base import ContentFile
 from django.core.mail.backends.base import BaseEmailBackend
-from .settings import get_default_priority
+from django.core.mail.backends.smtp import EmailBackend as SMTPEmailBackend
+from django.core.mail.message import sanitize_address
+from django.core.mail.utils import DNS_NAME
+from django.utils.module_loading import import_string
+
+from .logutils import setup_loghandlers
+from .settings import get_backend, get_default_priority
+
+logger = setup_loghandlers('INFO')
+
+
+@dataclass
+class SendResult:
+    """
+    The outcome of sending one message with a backend's ``send_batch()``.
+
+    Backends in ``POST_OFFICE['BACKENDS']`` may implement
+    ``send_batch(email_messages) -> list[SendResult]`` (or ``async def
+    asend_batch()`` for the asyncio engine), returning one result per message,
+    in order. ``send_queued_mail`` then uses it instead of ``send_messages()``,
+    so that emails of a chunk (see ``CHUNK_SIZE``) are sent, failed and logged
+    one by one.
+    """
+
+    # Set if the message was not sent
+    exception: Optional[Exception] = None
+    # The ID the email service provider assigned to the message, used by its webhooks
+    provider_message_id: str = ''
+
+    @property
+    def success(self) -> bool:
+        return self.exception is None
+
+
+def is_batch_backend(alias: str) -> bool:
+    """
+    Returns True if the backend configured for ``alias`` implements ``send_batch()`` or ``asend_batch()``.
+    """
+    backend = import_string(get_backend(alias))
+    return hasattr(backend, 'send_batch') or hasattr(backend, 'asend_batch')
+
+
+def apply_send_results(emails, results: list[SendResult]) -> list[tuple[bool, Optional[Exception]]]:
+    """
+    Sets the provider message IDs of ``emails`` from the ``send_batch()`` results
+    and returns the outcome of each email, as ``(success, exception)``.
+    """
+    if len(results) != len(emails):
+        raise ValueError(f'send_batch() returned {len(results)} results for {len(emails)} messages')
+    outcomes = []
+    for email, result in zip(emails, results):
+        if result.success:
+            email.provider_message_id = result.provider_message_id or ''
+            logger.debug(f'Successfully sent email #{email.id}')
+        else:
+            logger.error(f'Failed to send email #{email.id}: {result.exception!r}')
+        outcomes.append((result.success, result.exception))
+    return outcomes
 
 
 class EmailBackend(BaseEmailBackend):
@@ -17,6 +78,7 @@ class EmailBackend(BaseEmailBackend):
         Queue one or more EmailMessage objects and returns the number of
         email messages sent.
         """
+        from .dispatcher import dispatch_now
         from .mail import create
         from .models import STATUS, Email
         from .utils import create_attachments
@@ -72,7 +134,7 @@ class EmailBackend(BaseEmailBackend):
             emails.append(email)
 
             if default_priority == 'now':
-                status = email.dispatch()
+                status = dispatch_now(email)
                 if status == STATUS.sent:
                     num_sent += 1
 
@@ -80,3 +142,74 @@ class EmailBackend(BaseEmailBackend):
             email_queued.send(sender=Email, emails=emails)
 
         return num_sent
+
+
+class AsyncSMTPEmailBackend(SMTPEmailBackend):
+    """
+    An SMTP backend for the asyncio sending engine, built on aiosmtplib (``pip
+    install aiosmtplib``). Takes the same settings as Django's SMTP backend and
+    behaves like it when used synchronously.
+
+    With the asyncio engine, every delivery in flight gets its own SMTP
+    connection. Connections are reused by later deliveries once they're idle.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.idle_clients = []
+
+    async def asend_messages(self, email_messages):
+        import aiosmtplib
+
+        if not email_messages:
+            return 0
+
+        client = self.idle_clients.pop() if self.idle_clients else await self._aopen()
+        num_sent = 0
+        try:
+            for message in email_messages:
+                if not message.recipients():
+                    continue
+                encoding = message.encoding or settings.DEFAULT_CHARSET
+                from_email = sanitize_address(message.from_email, encoding)
+                recipients = [sanitize_address(addr, encoding) for addr in message.recipients()]
+                try:
+                    await client.sendmail(from_email, recipients, message.message().as_bytes(linesep='\r\n'))
+                except aiosmtplib.SMTPException:
+                    if not self.fail_silently:
+                        raise
+                else:
+                    num_sent += 1
+        except BaseException:
+            # The connection may be broken (or cancelled halfway through a command), don't reuse it
+            client.close()
+            raise
+        self.idle_clients.append(client)
+        return num_sent
+
+    async def _aopen(self):
+        import aiosmtplib
+
+        client = aiosmtplib.SMTP(
+            hostname=self.host,
+            port=self.port,
+            username=self.username or None,
+            password=self.password or None,
+            local_hostname=DNS_NAME.get_fqdn(),
+            use_tls=self.use_ssl,
+            start_tls=self.use_tls,
+            timeout=self.timeout,
+            client_cert=self.ssl_certfile,
+            client_key=self.ssl_keyfile,
+        )
+        # Logs in too, if a username and password are set
+        await client.connect()
+        return client
+
+    async def aclose(self):
+        clients, self.idle_clients = self.idle_clients, []
+        for client in clients:
+            try:
+                await client.quit()
+            except Exception:
+                client.close()
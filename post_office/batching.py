@@ -0,0 +1,89 @@
+"""
+Adapts the number of emails claimed per batch by ``send_queued_mail_until_done()``
+when ``POST_OFFICE['ADAPTIVE_BATCH_SIZE']`` is enabled:
+
+    POST_OFFICE = {
+        'ADAPTIVE_BATCH_SIZE': True,
+        'MIN_BATCH_SIZE': 10,
+        'MAX_BATCH_SIZE': 1000,
+    }
+"""
+
+from typing import Optional
+
+from .settings import (
+    get_adaptive_batch_size,
+    get_batch_delivery_timeout,
+    get_batch_size,
+    get_max_batch_size,
+    get_min_batch_size,
+)
+
+# Weight of the last batch in the average latency per email
+SMOOTHING = 0.5
+# Batches with more failures than this are most likely overloading the backend
+MAX_FAILURE_RATE = 0.2
+# A latency per email this much higher than the average means the last batch was too large
+LATENCY_TOLERANCE = 0.1
+GROWTH_FACTOR = 1.5
+SHRINK_FACTOR = 0.5
+
+
+class AdaptiveBatchSize:
+    """
+    Starts at ``initial`` emails per batch and keeps growing the batch size
+    between ``minimum`` and ``maximum`` while that doesn't increase the time spent
+    per email, so that the overhead of claiming a batch (queries, processes,
+    connections) is spread over more emails. The batch size is reduced when
+    the time per email goes up, when many emails fail, and when a batch would
+    take more than ``time_budget`` seconds.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, time_budget: float):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.time_budget = time_budget
+        self.size = self._clamp(initial)
+        # Average seconds spent per email
+        self.latency = None
+
+    def record(self, attempted: int, failed: int, elapsed: float) -> None:
+        """
+        Adjusts ``size`` after a batch of ``attempted`` emails, ``failed`` of
+        which weren't sent, took ``elapsed`` seconds.
+        """
+        if not attempted:
+            return
+        if failed / attempted > MAX_FAILURE_RATE:
+            self.size = self._clamp(self.size * SHRINK_FACTOR)
+            return
+        if attempted < self.size:
+            # The queue ran dry, this batch says nothing about the batch size
+            return
+
+        latency = elapsed / attempted
+        average = self.latency
+        self.latency = latency if average is None else SMOOTHING * latency + (1 - SMOOTHING) * average
+        if average is not None and latency > average * (1 + LATENCY_TOLERANCE):
+            self.size = self._clamp(self.size * SHRINK_FACTOR)
+        else:
+            self.size = self._clamp(self.size * GROWTH_FACTOR)
+
+        if self.latency > 0:
+            # Stay well clear of BATCH_DELIVERY_TIMEOUT
+            self.size = self._clamp(min(self.size, self.time_budget / self.latency))
+
+    def _clamp(self, size: float) -> int:
+        return max(self.minimum, min(self.maximum, int(size)))
+
+
+def get_batch_sizer() -> Optional[AdaptiveBatchSize]:
+    if not get_adaptive_batch_size():
+        return None
+    return AdaptiveBatchSize(
+        initial=get_batch_size(),
+        minimum=get_min_batch_size(),
+        maximum=get_max_batch_size(),
+        time_budget=get_batch_delivery_timeout() / 2,
+    )
+
@@ -34,6 +34,20 @@ class ConnectionHandler:
         self._connections.connections[alias] = connection
         return connection
 
+    def discard(self, alias):
+        """
+        Closes and forgets this thread's connection of ``alias``, e.g. after a
+        send through it hung. The next __getitem__ opens a new one.
+        """
+        connection = getattr(self._connections, 'connections', {}).pop(alias, None)
+        if connection is None:
+            return
+        try:
+            connection.close()
+        except Exception:
+            # The connection is most likely broken already
+            pass
+
     def all(self):
         return getattr(self._connections, 'connections', {}).values()
 
@@ -0,0 +1,143 @@
+"""
+Sends emails with priority ``now`` from background threads when
+``POST_OFFICE['BACKGROUND_DISPATCH']`` is enabled, so that ``mail.send()``
+doesn't block the request on the mail server:
+
+    POST_OFFICE = {
+        'BACKGROUND_DISPATCH': True,
+        'DISPATCH_THREADS': 4,
+        'DISPATCH_QUEUE_SIZE': 100,
+    }
+"""
+
+import copy
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .logutils import setup_loghandlers
+from .models import STATUS, Email
+from .settings import get_background_dispatch, get_dispatch_queue_size, get_dispatch_threads, get_lease_duration
+from .signals import email_queued
+
+logger = setup_loghandlers('INFO')
+
+
+class Dispatcher:
+    """
+    Sends emails on up to ``threads`` threads, which keep their connections
+    (see ``post_office.connections``) open between emails. Up to ``queue_size``
+    more emails wait for a thread, beyond that emails are queued instead.
+    """
+
+    def __init__(self, threads: int, queue_size: int):
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='post_office-dispatch')
+        self.slots = threading.BoundedSemaphore(threads + queue_size)
+
+    def submit(self, email: Email, log_level: Optional[int] = None) -> bool:
+        """
+        Sends ``email`` in the background, returns False if all threads and
+        queue slots are taken.
+        """
+        if not self.slots.acquire(blocking=False):
+            return False
+        try:
+            self.executor.submit(self._dispatch, email, log_level)
+        except RuntimeError:
+            # Shut down in the meantime
+            self.slots.release()
+            return False
+        return True
+
+    def close(self) -> None:
+        """
+        Waits for the emails being sent and stops the threads.
+        """
+        self.executor.shutdown(wait=True)
+
+    def _dispatch(self, email: Email, log_level: Optional[int]) -> None:
+        try:
+            # These threads outlive requests, don't keep stale database connections
+            close_old_connections()
+            email.dispatch(log_level=log_level, disconnect_after_delivery=False)
+            Email.objects.filter(id=email.id).update(lease_owner='', lease_expires_at=None)
+        except Exception:
+            logger.exception(f'Failed to dispatch email #{email.id}')
+        finally:
+            self.slots.release()
+
+
+_dispatcher = None
+_dispatcher_key = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> Optional[Dispatcher]:
+    """
+    Returns this process' dispatcher, or None if ``BACKGROUND_DISPATCH`` isn't enabled.
+    """
+    global _dispatcher, _dispatcher_key
+    if not get_background_dispatch():
+        return None
+
+    # Threads don't survive a fork, every process has its own dispatcher
+    key = (os.getpid(), get_dispatch_threads(), get_dispatch_queue_size())
+    with _dispatcher_lock:
+        if _dispatcher_key != key:
+            _dispatcher = Dispatcher(get_dispatch_threads(), get_dispatch_queue_size())
+            _dispatcher_key = key
+        return _dispatcher
+
+
+def close_dispatcher() -> None:
+    """
+    Waits for the emails being dispatched in the background, e.g. before the process exits.
+    """
+    global _dispatcher, _dispatcher_key
+    with _dispatcher_lock:
+        dispatcher, _dispatcher, _dispatcher_key = _dispatcher, None, None
+    if dispatcher is not None:
+        dispatcher.close()
+
+
+def dispatch_now(email: Email, log_level: Optional[int] = None) -> Optional[int]:
+    """
+    Sends ``email``, which has priority ``now``, and returns its status. With
+    ``BACKGROUND_DISPATCH``, it's sent by a background thread once the current
+    transaction is committed and None is returned.
+    """
+    dispatcher = get_dispatcher()
+    if dispatcher is None:
+        return email.dispatch(log_level=log_level)
+
+    from .mail import _get_lease_owner
+
+    # Leased like a claimed email, so that it's requeued if this process dies before sending it
+    now = timezone.now()
+    email.status = STATUS.sending
+    email.lease_owner = _get_lease_owner()
+    email.lease_expires_at = now + get_lease_duration()
+    email.last_updated = now
+    email.save(update_fields=['status', 'lease_owner', 'lease_expires_at', 'last_updated'])
+    # The caller keeps using ``email``, the background thread gets its own copy
+    background_email = copy.copy(email)
+    transaction.on_commit(lambda: _submit(dispatcher, background_email, log_level))
+    return None
+
+
+def _submit(dispatcher: Dispatcher, email: Email, log_level: Optional[int]) -> None:
+    if dispatcher.submit(email, log_level):
+        return
+
+    logger.info(f'Background dispatch is saturated, queued email #{email.id}')
+    Email.objects.filter(id=email.id, status=STATUS.sending, lease_owner=email.lease_owner).update(
+        status=STATUS.queued, lease_owner='', lease_expires_at=None, last_updated=timezone.now()
+    )
+    email.status = STATUS.queued
+    email.lease_owner = ''
+    email.lease_expires_at = None
+    email_queued.send(sender=Email, emails=[email])
@@ -0,0 +1,119 @@
+"""
+Shapes deliveries per recipient domain, as configured in ``POST_OFFICE['DOMAIN_LIMITS']``:
+
+    POST_OFFICE = {
+        'DOMAIN_LIMITS': {
+            'gmail.com': {'MAX_CONCURRENCY': 5, 'RATE_LIMIT': 20},
+            'outlook.com': {'MAX_CONCURRENCY': 2},
+        },
+    }
+"""
+
+import math
+import threading
+import time
+from collections import Counter, deque
+from collections.abc import Callable, Iterator, Sequence
+from email.utils import getaddresses
+from multiprocessing import TimeoutError
+from typing import Optional
+
+from .models import Email
+from .ratelimit import get_domain_rate_limiter
+from .settings import get_domain_limits
+
+
+def get_limited_domains(email: Email, domain_limits: dict) -> frozenset[str]:
+    """
+    Returns the recipient domains of ``email`` that are listed in ``domain_limits``.
+    """
+    addresses = getaddresses([*(email.to or []), *(email.cc or []), *(email.bcc or [])])
+    domains = {address.rpartition('@')[2].lower() for _, address in addresses}
+    return frozenset(domains.intersection(domain_limits))
+
+
+class DomainScheduler:
+    """
+    Decides in which order the emails of a batch are handed to the sending
+    threads (or event loop). Emails are sent in their original order, except
+    that emails to a domain at its ``MAX_CONCURRENCY`` or out of ``RATE_LIMIT``
+    tokens are held back while later emails to other domains are sent.
+    """
+
+    def __init__(self, domain_limits: dict):
+        self.domain_limits = domain_limits
+        self.in_flight = Counter()
+        self.condition = threading.Condition()
+
+    def schedule(
+        self, emails: Sequence[Email], timeout: float, on_wait: Optional[Callable[[], None]] = None
+    ) -> Iterator[Email]:
+        """
+        Yields the emails of ``emails`` once they may be sent. Every email yielded
+        counts towards the concurrency of its domains until ``release()`` is called.
+        ``on_wait`` is called before waiting for emails to be released.
+        """
+        # Emails to the same limited domains are always sent in order, so only
+        # the first pending email of each of these groups needs to be checked
+        pending = {}
+        for index, email in enumerate(emails):
+            pending.setdefault(get_limited_domains(email, self.domain_limits), deque()).append((index, email))
+
+        waiting_since = time.monotonic()
+        while pending:
+            with self.condition:
+                retry_in = math.inf
+                for domains, queue in sorted(pending.items(), key=lambda item: item[1][0][0]):
+                    delay = self._acquire(domains)
+                    if delay == 0:
+                        break
+                    retry_in = min(retry_in, delay)
+                else:
+                    remaining = timeout - (time.monotonic() - waiting_since)
+                    if remaining <= 0:
+                        raise TimeoutError(f'No email could be sent in the last {timeout} seconds')
+                    if on_wait is not None:
+                        # Released emails may be waiting to be sent by the caller
+                        self.condition.release()
+                        try:
+                            on_wait()
+                        finally:
+                            self.condition.acquire()
+                    # Woken up early by release()
+                    self.condition.wait(min(retry_in, remaining))
+                    continue
+
+            _, email = queue.popleft()
+            if not queue:
+                del pending[domains]
+            waiting_since = time.monotonic()
+            yield email
+
+    def release(self, email: Email) -> None:
+        with self.condition:
+            for domain in get_limited_domains(email, self.domain_limits):
+                self.in_flight[domain] -= 1
+            self.condition.notify_all()
+
+    def _acquire(self, domains: frozenset[str]) -> float:
+        """
+        Returns 0 if an email to ``domains`` may be sent now, otherwise the
+        number of seconds to wait (infinite until another email is released).
+        """
+        for domain in domains:
+            if self.in_flight[domain] >= self.domain_limits[domain].get('MAX_CONCURRENCY', math.inf):
+                return math.inf
+        for domain in domains:
+            rate_limiter = get_domain_rate_limiter(domain)
+            if rate_limiter is not None and (delay := rate_limiter.reserve()):
+                return delay
+        for domain in domains:
+            self.in_flight[domain] += 1
+        return 0
+
+
+def get_domain_scheduler():
+    domain_limits = get_domain_limits()
+    if not domain_limits:
+        return None
+    return DomainScheduler(domain_limits)
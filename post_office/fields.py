@@ -1,8 +1,69 @@
-from django.db.models import TextField
+import base64
+import json
+import zlib
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import JSONField, TextField
 from django.utils.translation import gettext_lazy as _
 
+from .settings import get_compression
 from .validators import validate_comma_separated_emails
 
+try:
+    from compression import zstd  # Python 3.14+, otherwise the zstandard package
+except ImportError:  # pragma: no cover - optional dependency
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+# Compressed values start with the header of their format, values without a header are stored as is
+COMPRESSION_HEADERS = {'zlib': '\x1fzlib:', 'zstd': '\x1fzstd:'}
+# Shorter values aren't worth compressing
+COMPRESSION_MIN_LENGTH = 256
+
+
+def compress(value: str, algorithm: str) -> str:
+    """
+    Returns ``value`` compressed with ``algorithm`` (``'zlib'`` or ``'zstd'``),
+    prefixed with its format header. Returns ``value`` itself if it's short or
+    doesn't compress.
+    """
+    if algorithm not in COMPRESSION_HEADERS:
+        raise ImproperlyConfigured(f'Unknown POST_OFFICE["COMPRESSION"]: {algorithm!r}, use "zlib" or "zstd"')
+    if len(value) < COMPRESSION_MIN_LENGTH:
+        return value
+
+    data = value.encode('utf-8', 'surrogatepass')
+    if algorithm == 'zstd':
+        if zstd is None:
+            raise ImproperlyConfigured('Compressing with zstd requires the zstandard package')
+        compressed = zstd.compress(data)
+    else:
+        compressed = zlib.compress(data)
+    compressed_value = COMPRESSION_HEADERS[algorithm] + base64.b64encode(compressed).decode('ascii')
+    return compressed_value if len(compressed_value) < len(value) else value
+
+
+def decompress(value: str) -> str:
+    """
+    Returns the original of a value returned by ``compress()``, values that aren't compressed are returned as is.
+    """
+    if not value.startswith('\x1f'):
+        return value
+    for algorithm, header in COMPRESSION_HEADERS.items():
+        if not value.startswith(header):
+            continue
+        data = base64.b64decode(value[len(header) :])
+        if algorithm == 'zstd':
+            if zstd is None:
+                raise ImproperlyConfigured('Reading zstd compressed values requires the zstandard package')
+            data = zstd.decompress(data)
+        else:
+            data = zlib.decompress(data)
+        return data.decode('utf-8', 'surrogatepass')
+    return value
+
 
 class CommaSeparatedEmailField(TextField):
     default_validators = [validate_comma_separated_emails]
@@ -56,3 +117,46 @@ class CommaSeparatedEmailField(TextField):
         field_class = 'django.db.models.fields.TextField'
         args, kwargs = introspector(self)
         return (field_class, args, kwargs)
+
+
+class CompressedTextField(TextField):
+    """
+    A ``TextField`` whose values are compressed with ``POST_OFFICE['COMPRESSION']``
+    when saved. Values saved uncompressed, e.g. before it was enabled, read as usual.
+    """
+
+    def from_db_value(self, value, expression, connection):
+        if isinstance(value, str):
+            return decompress(value)
+        return value
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        algorithm = get_compression()
+        if algorithm and isinstance(value, str):
+            return compress(value, algorithm)
+        return value
+
+
+class CompressedJSONField(JSONField):
+    """
+    A ``JSONField`` that stores its values as compressed JSON strings when
+    ``POST_OFFICE['COMPRESSION']`` is set, e.g. for ``CONTEXT_FIELD_CLASS``.
+    Compressed values can't be queried by key.
+    """
+
+    def from_db_value(self, value, expression, connection):
+        value = super().from_db_value(value, expression, connection)
+        if isinstance(value, str) and value.startswith('\x1f'):
+            return json.loads(decompress(value), cls=self.decoder)
+        return value
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        algorithm = get_compression()
+        if algorithm and isinstance(value, (dict, list)):
+            serialized = json.dumps(value, cls=self.encoder)
+            compressed = compress(serialized, algorithm)
+            if compressed != serialized:
+                return compressed
+        return value
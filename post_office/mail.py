@@ -1,39 +1,75 @@
+import math
 import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from collections import deque
 from collections.abc import Sequence
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from functools import partial
 from email.utils import make_msgid
+from multiprocessing import TimeoutError
 from multiprocessing.dummy import Pool as ThreadPool
 from typing import Any, Optional
+from uuid import uuid4
 
 from django.conf import settings
-from django.core.exceptions import ValidationError
-from django.db import connection as db_connection
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import close_old_connections, connection as db_connection, transaction
 from django.db.models import Q, QuerySet
+from django.db.models.functions import Coalesce
 from django.template import Context, Template
 from django.utils import timezone
 
 from .connections import connections
+from .dispatcher import dispatch_now
+from .domains import get_domain_scheduler
 from .lockfile import FileLock, FileLocked, default_lockfile
 from .logutils import setup_loghandlers
-from .models import PRIORITY, STATUS, Email, EmailTemplate, Log
+from .models import PRIORITY, STATUS, Email, EmailBody, EmailTemplate, Log
+from .backends import apply_send_results, is_batch_backend
+from .batching import get_batch_sizer
+from .aio import AsyncioPool, is_async_backend, run_task_async, send_email_async, send_emails_async
+from .notify import QueueListener, get_queue_listener
+from .ratelimit import wait_for_rate_limit
 from .settings import (
+    get_async_concurrency,
     get_available_backends,
     get_batch_delivery_timeout,
     get_batch_size,
+    get_checkpoint_interval,
+    get_checkpoint_size,
+    get_chunk_size,
+    get_deduplicate_bodies,
+    get_lease_duration,
     get_log_level,
+    get_max_poll_interval,
     get_max_retries,
     get_message_id_enabled,
     get_message_id_fqdn,
-    get_retry_timedelta,
+    get_min_poll_interval,
+    get_notify_enabled,
+    get_notify_poll_interval,
+    get_persistent_workers,
+    get_row_locking_enabled,
+    get_sending_engine,
+    get_send_timeout,
     get_sending_order,
+    get_store_recipients,
     get_threads_per_process,
 )
 from .signals import email_queued
 from .utils import (
     create_attachments,
     get_email_template,
+    get_retry_delay,
     parse_emails,
     parse_priority,
     split_emails,
+    store_recipients,
 )
 
 logger = setup_loghandlers('INFO')
@@ -41,13 +77,68 @@ logger = setup_loghandlers('INFO')
 
 def _send_email(email: Email, log_level: int) -> tuple[bool, Optional[Exception]]:
     try:
-        connection = connections[email.backend_alias or 'default']
+        alias = email.backend_alias or 'default'
+        wait_for_rate_limit(alias)
+        connection = connections[alias]
         email.dispatch(log_level=log_level, commit=False, disconnect_after_delivery=False, connection=connection)
         logger.debug(f'Successfully sent email #{email.id}')
         return True, None
     except Exception as e:
         logger.exception(f'Failed to send email #{email.id}')
         return False, e
+    finally:
+        # Release the prepared message (and its attachments) as soon as it's sent
+        email._cached_email_message = None
+
+
+def _send_emails(emails: list[Email], log_level: int) -> list[tuple[bool, Optional[Exception]]]:
+    """
+    Sends ``emails``, which share a backend, with a single ``send_batch()`` call
+    (see ``backends.SendResult``) or otherwise ``send_messages()`` call. The latter
+    only reports how many messages it sent, so if it fails, all of them are failed.
+    """
+    alias = emails[0].backend_alias or 'default'
+    try:
+        for _ in emails:
+            wait_for_rate_limit(alias)
+        connection = connections[alias]
+        email_messages = [email.email_message() for email in emails]
+        if not hasattr(connection, 'send_batch'):
+            connection.send_messages(email_messages)
+            logger.debug(f'Successfully sent emails {", ".join(f"#{email.id}" for email in emails)}')
+            return [(True, None)] * len(emails)
+        return apply_send_results(emails, connection.send_batch(email_messages))
+    except Exception as e:
+        logger.exception(f'Failed to send emails {", ".join(f"#{email.id}" for email in emails)}')
+        return [(False, e)] * len(emails)
+    finally:
+        for email in emails:
+            email._cached_email_message = None
+
+
+@dataclass(eq=False)
+class _SendTask:
+    """
+    A call of ``_send_email()`` or ``_send_emails()`` submitted by ``_send_bulk()``.
+    """
+
+    emails: list[Email]
+    result: Any = None
+    # Set by the thread (or event loop) once it starts sending
+    started_at: Optional[float] = None
+    # Set once the send is done or timed out, see SEND_TIMEOUT
+    released: bool = False
+    timed_out: bool = False
+
+
+def _run_task(task: _SendTask, send, *args):
+    task.started_at = time.monotonic()
+    try:
+        return send(*args)
+    finally:
+        if task.timed_out:
+            # Given up on by _send_bulk() while it hung, the connection may be broken
+            connections.discard(task.emails[0].backend_alias or 'default')
 
 
 def create(
@@ -134,11 +225,43 @@ def create(
         )
 
     if commit:
+        if get_deduplicate_bodies():
+            store_bodies([email])
         email.save()
+        if get_store_recipients():
+            store_recipients([email])
 
     return email
 
 
+def store_bodies(emails: Sequence[Email]) -> None:
+    """
+    Moves the message and html_message of ``emails`` to ``EmailBody`` rows,
+    shared by all emails with the same content. Emails must be saved afterwards.
+    """
+    emails = [email for email in emails if email.message or email.html_message]
+    if not emails:
+        return
+
+    content_hashes = [EmailBody.get_content_hash(email.message, email.html_message) for email in emails]
+    bodies = {}
+    for email, content_hash in zip(emails, content_hashes):
+        if content_hash not in bodies:
+            bodies[content_hash] = EmailBody(
+                content_hash=content_hash, message=email.message, html_message=email.html_message
+            )
+
+    # Bodies stored before (possibly by another process at the same time) are reused
+    EmailBody.objects.bulk_create(bodies.values(), ignore_conflicts=True)
+    body_ids = dict(EmailBody.objects.filter(content_hash__in=bodies).values_list('content_hash', 'id'))
+    for content_hash, body in bodies.items():
+        body.pk = body_ids[content_hash]
+    for email, content_hash in zip(emails, content_hashes):
+        email.body = bodies[content_hash]
+        email.message = ''
+        email.html_message = ''
+
+
 def send(
     recipients=None,
     sender=None,
@@ -233,7 +356,7 @@ def send(
         email.attachments.add(*attachments)
 
     if priority == PRIORITY.now:
-        email.dispatch(log_level=log_level)
+        dispatch_now(email, log_level)
     elif commit:
         email_queued.send(sender=Email, emails=[email])
 
@@ -248,28 +371,163 @@ def send_many(kwargs_list: list[dict[str, Any]]) -> list[Email]:
     """
     emails = [send(commit=False, **kwargs) for kwargs in kwargs_list]
     if emails:
-        Email.objects.bulk_create(emails)
+        if get_deduplicate_bodies():
+            store_bodies(emails)
+        if get_store_recipients():
+            with transaction.atomic():
+                if db_connection.features.can_return_rows_from_bulk_insert:
+                    Email.objects.bulk_create(emails)
+                else:
+                    # Recipients need the primary keys of the emails
+                    for email in emails:
+                        email.save()
+                store_recipients(emails)
+        else:
+            Email.objects.bulk_create(emails)
         email_queued.send(sender=Email, emails=emails)
 
     return emails
 
 
-def get_queued() -> QuerySet[Email]:
+def get_queued(batch_size: Optional[int] = None, priorities: Optional[Sequence[int]] = None) -> QuerySet[Email]:
     """
     Returns the queryset of emails eligible for sending – fulfilling these conditions:
      - Status is queued or requeued
      - Has scheduled_time before the current time or is None
      - Has expires_at after the current time or is None
+     - Has one of ``priorities``, if given
     """
+    if batch_size is None:
+        batch_size = get_batch_size()
     now = timezone.now()
     query = (Q(scheduled_time__lte=now) | Q(scheduled_time=None)) & (Q(expires_at__gt=now) | Q(expires_at=None))
+    if priorities is not None:
+        query &= Q(priority__in=priorities)
     return (
         Email.objects.filter(query, status__in=[STATUS.queued, STATUS.requeued])
         .order_by(*get_sending_order())
-        .prefetch_related('attachments')[: get_batch_size()]
+        .prefetch_related('attachments')[:batch_size]
     )
 
 
+def supports_row_locking() -> bool:
+    """
+    Returns True if ``ROW_LOCKING_ENABLED`` is set and the database can lock
+    rows with ``SELECT ... FOR UPDATE``.
+    """
+    return get_row_locking_enabled() and db_connection.features.has_select_for_update
+
+
+def claim_queued(batch_size: Optional[int] = None, priorities: Optional[Sequence[int]] = None) -> list[Email]:
+    """
+    Claims a batch of queued emails for sending. Claimed emails are marked as
+    ``sending`` and leased to this worker until ``LEASE_DURATION`` from now,
+    emails whose lease expires before they're delivered are requeued by
+    ``requeue_expired_leases()``.
+
+    Where supported, candidates are selected with ``SELECT ... FOR UPDATE SKIP
+    LOCKED`` so that concurrent workers (on any host) don't contend for the same rows.
+    If ``priorities`` is given, only emails with these priorities are claimed.
+    """
+    lease_owner = _get_lease_owner()
+    now = timezone.now()
+    with transaction.atomic():
+        email_ids = list(_lock_rows(get_queued(batch_size, priorities)).values_list('id', flat=True))
+        if not email_ids:
+            return []
+        # Emails claimed by another worker in the meantime are no longer queued and won't be updated
+        Email.objects.filter(id__in=email_ids, status__in=[STATUS.queued, STATUS.requeued]).update(
+            status=STATUS.sending,
+            lease_owner=lease_owner,
+            lease_expires_at=now + get_lease_duration(),
+            last_updated=now,
+        )
+
+    return list(
+        Email.objects.filter(id__in=email_ids, status=STATUS.sending, lease_owner=lease_owner)
+        .order_by(*get_sending_order())
+        .prefetch_related('attachments')
+    )
+
+
+def _lock_rows(queryset: QuerySet[Email]) -> QuerySet[Email]:
+    """
+    Locks the rows of ``queryset`` with ``SELECT ... FOR UPDATE``, skipping rows
+    locked by other workers where the database supports it. Without ``SKIP
+    LOCKED`` support, concurrent workers wait for each other instead.
+    """
+    features = db_connection.features
+    if not features.has_select_for_update:
+        return queryset
+    return queryset.select_for_update(
+        skip_locked=features.has_select_for_update_skip_locked,
+        # FOR NO KEY UPDATE doesn't block inserting Log rows pointing to these emails
+        no_key=features.has_select_for_no_key_update,
+    )
+
+
+def _get_lease_owner() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}'
+
+
+def requeue_expired_leases() -> int:
+    """
+    Requeues emails whose lease has expired, for example because the worker
+    sending them was killed. An expired lease counts as a failed attempt, emails
+    that already used up ``MAX_RETRIES`` are marked as failed instead. Returns
+    the number of requeued emails.
+    """
+    now = timezone.now()
+    expired_emails = Email.objects.filter(status=STATUS.sending, lease_expires_at__lt=now)
+
+    num_failed = (
+        expired_emails.alias(retries=Coalesce('number_of_retries', 0))
+        .filter(retries__gte=get_max_retries())
+        .update(status=STATUS.failed, lease_owner='', lease_expires_at=None, last_updated=now)
+    )
+    num_requeued = expired_emails.update(
+        status=STATUS.requeued,
+        number_of_retries=Coalesce('number_of_retries', 0) + 1,
+        lease_owner='',
+        lease_expires_at=None,
+        last_updated=now,
+    )
+    if num_failed:
+        logger.warning('Marked %s emails with expired leases as failed', num_failed)
+    if num_requeued:
+        logger.warning('Requeued %s emails with expired leases', num_requeued)
+    return num_requeued
+
+
+def _held_leases(emails: Sequence[Email]) -> QuerySet[Email]:
+    """
+    Returns the emails of ``emails`` that are still leased to the worker that
+    claimed them. Emails that were never leased (e.g. passed to ``_send_bulk()``
+    directly) are included, emails whose lease was lost (requeued after it
+    expired, or claimed by another worker since) are not.
+    """
+    leased_ids = [email.id for email in emails if email.lease_owner]
+    unleased_ids = [email.id for email in emails if not email.lease_owner]
+    lease_owners = {email.lease_owner for email in emails if email.lease_owner}
+    return Email.objects.filter(
+        Q(id__in=unleased_ids) | Q(id__in=leased_ids, status=STATUS.sending, lease_owner__in=lease_owners)
+    )
+
+
+def attach_bodies(emails: list[Email]) -> None:
+    """
+    Loads the bodies shared by ``emails`` (see ``store_bodies()``) with a single query.
+    """
+    body_ids = {email.body_id for email in emails if email.body_id is not None}
+    if not body_ids:
+        return
+
+    body_map = EmailBody.objects.in_bulk(body_ids)
+    for email in emails:
+        if email.body_id is not None:
+            email.body = body_map.get(email.body_id)
+
+
 def attach_templates(emails: list[Email]) -> None:
     """
     Efficiently attach template objects to emails using a single query
@@ -288,49 +546,58 @@ def attach_templates(emails: list[Email]) -> None:
             email.template = template_map.get(email.template_id)
 
 
-def send_queued(processes: int = 1, log_level: Optional[int] = None) -> tuple[int, int, int]:
+def send_queued(
+    processes: int = 1,
+    log_level: Optional[int] = None,
+    worker_pool: Optional['WorkerPool'] = None,
+    engine: Optional[str] = None,
+    priorities: Optional[Sequence[int]] = None,
+    batch_size: Optional[int] = None,
+) -> tuple[int, int, int]:
     """
-    Sends out all queued mails that has scheduled_time less than now or None
+    Sends out all queued mails that has scheduled_time less than now or None.
+    If ``worker_pool`` is given, batches are sent by its long-lived workers.
+    ``engine`` overrides the ``SENDING_ENGINE`` setting. If ``priorities`` is
+    given, only emails with these priorities are sent, see priority lanes.
+    ``batch_size`` overrides the ``BATCH_SIZE`` setting.
     """
-    queued_emails = list(get_queued())
+    if log_level is None:
+        log_level = get_log_level()
+
+    requeue_expired_leases()
+
+    if supports_row_locking():
+        return _send_queued_with_row_locking(processes, log_level, worker_pool, engine, priorities, batch_size)
+
+    queued_emails = claim_queued(batch_size, priorities)
     attach_templates(queued_emails)
+    attach_bodies(queued_emails)
     total_sent, total_failed, total_requeued = 0, 0, 0
     total_email = len(queued_emails)
 
     logger.info(f'Started sending {total_email} emails with {processes} processes.')
 
-    if log_level is None:
-        log_level = get_log_level()
-
     if queued_emails:
         # Don't use more processes than number of emails
         if total_email < processes:
             processes = total_email
 
+        persistent = worker_pool is not None
         if processes == 1:
             total_sent, total_failed, total_requeued = _send_bulk(
                 emails=queued_emails,
                 uses_multiprocessing=False,
                 log_level=log_level,
+                persistent=persistent,
+                engine=engine,
             )
         else:
             email_lists = split_emails(queued_emails, processes)
-
-            # Use 'fork' context to ensure child processes inherit Django setup.
-            # This is required for Python 3.14+ where the default start method is 'forkserver' on Linux.
-            ctx = multiprocessing.get_context('fork')
-            with ctx.Pool(processes) as pool:
-                tasks = []
-                for email_list in email_lists:
-                    tasks.append(pool.apply_async(_send_bulk, args=(email_list,)))
-
-                timeout = get_batch_delivery_timeout()
-                results = []
-
-                # Wait for all tasks to complete with a timeout
-                # The get method is used with a timeout to wait for each result
-                for task in tasks:
-                    results.append(task.get(timeout=timeout))
+            results = _run_in_processes(
+                _send_bulk,
+                [(email_list, not persistent, log_level, persistent, engine) for email_list in email_lists],
+                worker_pool,
+            )
 
             total_sent = sum(result[0] for result in results)
             total_failed = sum(result[1] for result in results)
@@ -347,67 +614,599 @@ def send_queued(processes: int = 1, log_level: Optional[int] = None) -> tuple[in
     return total_sent, total_failed, total_requeued
 
 
+def _send_queued_with_row_locking(
+    processes: int,
+    log_level: int,
+    worker_pool: Optional['WorkerPool'] = None,
+    engine: Optional[str] = None,
+    priorities: Optional[Sequence[int]] = None,
+    batch_size: Optional[int] = None,
+) -> tuple[int, int, int]:
+    """
+    Instead of claiming one batch and splitting it, every process claims its
+    own share of the batch with ``claim_queued()``. Other workers, on this
+    host or any other, skip the rows while they're being claimed.
+    """
+    batch_size = math.ceil((batch_size or get_batch_size()) / processes)
+
+    persistent = worker_pool is not None
+    if processes > 1 and not get_queued(priorities=priorities).exists():
+        # Don't start processes just to find out the queue is empty, e.g. on every idle poll of the daemon
+        return 0, 0, 0
+
+    logger.info(f'Started claiming emails with {processes} processes.')
+    if processes == 1:
+        results = [
+            _claim_and_send_bulk(
+                batch_size,
+                uses_multiprocessing=False,
+                log_level=log_level,
+                persistent=persistent,
+                engine=engine,
+                priorities=priorities,
+            )
+        ]
+    else:
+        results = _run_in_processes(
+            _claim_and_send_bulk,
+            [(batch_size, not persistent, log_level, persistent, engine, priorities)] * processes,
+            worker_pool,
+        )
+
+    total_sent = sum(result[0] for result in results)
+    total_failed = sum(result[1] for result in results)
+    total_requeued = sum(result[2] for result in results)
+
+    logger.info(
+        '%s emails attempted, %s sent, %s failed, %s requeued',
+        total_sent + total_failed + total_requeued,
+        total_sent,
+        total_failed,
+        total_requeued,
+    )
+
+    return total_sent, total_failed, total_requeued
+
+
+def _init_worker_process() -> None:
+    # Worker processes inherit the signal handlers installed by send_queued_mail_forever().
+    # Let SIGINT reach the parent only, and let Pool.terminate() stop workers with SIGTERM.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def _init_persistent_worker_process(shutdown_barrier) -> None:
+    global _shutdown_barrier
+    _init_worker_process()
+    _shutdown_barrier = shutdown_barrier
+
+
+def _claim_and_send_bulk(
+    batch_size: int,
+    uses_multiprocessing: bool = True,
+    log_level: Optional[int] = None,
+    persistent: bool = False,
+    engine: Optional[str] = None,
+    priorities: Optional[Sequence[int]] = None,
+) -> tuple[int, int, int]:
+    if uses_multiprocessing:
+        db_connection.close()
+
+    emails = claim_queued(batch_size, priorities)
+    if not emails:
+        return 0, 0, 0
+    attach_templates(emails)
+    attach_bodies(emails)
+    return _send_bulk(emails, uses_multiprocessing=False, log_level=log_level, persistent=persistent, engine=engine)
+
+
+def _run_in_processes(func, args_list: list[tuple], worker_pool: Optional['WorkerPool'] = None) -> list:
+    """
+    Calls ``func`` once for each item in ``args_list``, each in its own process,
+    and returns the results. Uses the processes of ``worker_pool`` if given,
+    otherwise new processes are started.
+
+    A process that doesn't finish within ``BATCH_DELIVERY_TIMEOUT`` is given up on,
+    its result counts as ``(0, 0, 0)`` while the results of the others are kept.
+    Statuses it already wrote are kept too, its emails still in flight are
+    requeued once their lease expires.
+    """
+    if worker_pool is not None:
+        results, num_timed_out = _apply_in_pool_until_timeout(worker_pool.process_pool, func, args_list)
+        if num_timed_out:
+            # The stuck processes would hold up the next batches
+            worker_pool.restart()
+        return results
+
+    # Use 'fork' context to ensure child processes inherit Django setup.
+    # This is required for Python 3.14+ where the default start method is 'forkserver' on Linux.
+    ctx = multiprocessing.get_context('fork')
+    with ctx.Pool(len(args_list), initializer=_init_worker_process) as pool:
+        return _apply_in_pool_until_timeout(pool, func, args_list)[0]
+
+
+def _apply_in_pool_until_timeout(pool, func, args_list: list[tuple]) -> tuple[list, int]:
+    tasks = [pool.apply_async(func, args=args) for args in args_list]
+    deadline = time.monotonic() + get_batch_delivery_timeout()
+    results = []
+    num_timed_out = 0
+    for task in tasks:
+        try:
+            results.append(task.get(timeout=max(deadline - time.monotonic(), 0)))
+        except TimeoutError:
+            logger.error('A sending process timed out, its emails in flight are requeued once their lease expires')
+            results.append((0, 0, 0))
+            num_timed_out += 1
+    return results, num_timed_out
+
+
+def _apply_in_pool(pool, func, args_list: list[tuple]) -> list:
+    tasks = []
+    for args in args_list:
+        tasks.append(pool.apply_async(func, args=args))
+
+    timeout = get_batch_delivery_timeout()
+    results = []
+
+    # Wait for all tasks to complete with a timeout
+    # The get method is used with a timeout to wait for each result
+    for task in tasks:
+        results.append(task.get(timeout=timeout))
+
+    return results
+
+
+class WorkerPool:
+    """
+    Keeps worker processes, their sending threads and the backend connections
+    opened by these threads alive across batches, instead of starting and
+    tearing them down for every batch. Used by ``send_queued_mail_until_done()``
+    and ``send_queued_mail_forever()`` when ``PERSISTENT_WORKERS`` is enabled.
+    """
+
+    def __init__(self, processes: int = 1):
+        self.processes = processes
+        self.process_pool = None
+        if processes > 1:
+            self.process_pool = self._start_processes()
+
+    def _start_processes(self):
+        # Don't share this process' database connection with the workers, they open their own
+        db_connection.close()
+        ctx = multiprocessing.get_context('fork')
+        return ctx.Pool(
+            self.processes, initializer=_init_persistent_worker_process, initargs=(ctx.Barrier(self.processes),)
+        )
+
+    def restart(self) -> None:
+        """
+        Replaces the worker processes without waiting for them, e.g. when they are stuck on a batch that timed out.
+        """
+        self.process_pool.terminate()
+        self.process_pool.join()
+        self.process_pool = self._start_processes()
+
+    def close(self) -> None:
+        if self.process_pool is None:
+            _close_thread_pool()
+            return
+
+        try:
+            # Every worker has to close its own threads and connections, the barrier
+            # makes sure that each worker picks up exactly one of these tasks
+            _apply_in_pool(self.process_pool, _shutdown_worker, [()] * self.processes)
+        except Exception:
+            logger.exception('Failed to shut down worker processes cleanly')
+            self.process_pool.terminate()
+        else:
+            self.process_pool.close()
+        self.process_pool.join()
+
+
+@contextmanager
+def _worker_pool(processes: int):
+    if not get_persistent_workers():
+        yield None
+        return
+
+    worker_pool = WorkerPool(processes)
+    try:
+        yield worker_pool
+    finally:
+        worker_pool.close()
+
+
+# This process' long-lived sending threads, see WorkerPool
+_thread_pool = None
+_thread_pool_pid = None
+_thread_pool_size = 0
+# Set in worker processes started by WorkerPool
+_shutdown_barrier = None
+
+
+def _get_thread_pool() -> tuple[ThreadPool, int]:
+    global _thread_pool, _thread_pool_pid, _thread_pool_size
+    # Threads don't survive forking, worker processes start their own pool
+    if _thread_pool is None or _thread_pool_pid != os.getpid():
+        _thread_pool_size = get_threads_per_process()
+        _thread_pool = ThreadPool(_thread_pool_size)
+        _thread_pool_pid = os.getpid()
+    return _thread_pool, _thread_pool_size
+
+
+def _discard_thread_pool() -> None:
+    """
+    Stops this process' long-lived sending threads without waiting for them,
+    e.g. when they are stuck on a send that timed out. Their backend
+    connections are left to be closed when the threads are gone.
+    """
+    global _thread_pool
+    if _thread_pool is None or _thread_pool_pid != os.getpid():
+        return
+
+    pool, _thread_pool = _thread_pool, None
+    pool.terminate()
+
+
+def _close_thread_pool() -> None:
+    """
+    Stops this process' long-lived sending threads and closes the backend
+    connections they opened, as well as the ones opened while preparing emails.
+    """
+    global _thread_pool
+    connections.close()
+    if _thread_pool is None or _thread_pool_pid != os.getpid():
+        return
+
+    pool, _thread_pool = _thread_pool, None
+    # Backend connections are thread local, every thread has to close its own
+    barrier = threading.Barrier(_thread_pool_size)
+    pool.map(_close_thread_connections, [barrier] * _thread_pool_size, chunksize=1)
+    pool.close()
+    pool.join()
+
+
+def _close_thread_connections(barrier: threading.Barrier) -> None:
+    connections.close()
+    # Wait for the other threads, so that each thread runs this exactly once
+    try:
+        barrier.wait(timeout=get_batch_delivery_timeout())
+    except threading.BrokenBarrierError:
+        logger.warning('Timed out waiting for sending threads to close their connections')
+
+
+def _shutdown_worker() -> None:
+    _close_thread_pool()
+    db_connection.close()
+    # Wait for the other workers, so that each worker runs this exactly once
+    try:
+        _shutdown_barrier.wait(timeout=get_batch_delivery_timeout())
+    except threading.BrokenBarrierError:
+        logger.warning('Timed out waiting for worker processes to shut down')
+
+
 def _send_bulk(
-    emails: Sequence[Email], uses_multiprocessing: bool = True, log_level: Optional[int] = None
+    emails: Sequence[Email],
+    uses_multiprocessing: bool = True,
+    log_level: Optional[int] = None,
+    persistent: bool = False,
+    engine: Optional[str] = None,
 ) -> tuple[int, int, int]:
     # Multiprocessing does not play well with database connection
     # Fix: Close connections on forking process
     # https://groups.google.com/forum/#!topic/django-users/eCAIY9DAfG0
     if uses_multiprocessing:
         db_connection.close()
+    elif persistent:
+        close_old_connections()
 
     if log_level is None:
         log_level = get_log_level()
     assert log_level is not None
 
+    # Emails whose statuses are yet to be written, see checkpoint()
     sent_emails = []
     failed_emails = []  # This is a list of two tuples (email, exception)
     email_count = len(emails)
 
     logger.info(f'Process started, sending {email_count} emails')
 
-    emails_to_send = []
+    timeout = get_batch_delivery_timeout()
+    send_timeout = get_send_timeout()
+    # Captured before the statuses of failed emails are updated in memory
+    held_leases = _held_leases(emails)
+
+    lease_duration = get_lease_duration()
+    # At most ``timeout`` passes between two calls to renew_leases(),
+    # so leases are renewed before they expire
+    renew_interval = max(lease_duration.total_seconds() - timeout, 0) / 2
+    leases_renewed_at = time.monotonic()
+
+    def renew_leases():
+        nonlocal leases_renewed_at
+        if time.monotonic() - leases_renewed_at < renew_interval:
+            return
+        finished_ids = [email.id for email in sent_emails] + [email.id for email, _ in failed_emails]
+        held_leases.filter(status=STATUS.sending).exclude(id__in=finished_ids).update(
+            lease_expires_at=timezone.now() + lease_duration
+        )
+        leases_renewed_at = time.monotonic()
+
+    # Statuses are written while the batch is sent, so that if the process dies (or times out),
+    # only emails sent since the last checkpoint are sent again
+    checkpoint_size = get_checkpoint_size()
+    checkpoint_interval = get_checkpoint_interval()
+    checkpointed_at = time.monotonic()
+    totals = [0, 0, 0]
+
+    def checkpoint(force=False):
+        nonlocal checkpointed_at
+        if not sent_emails and not failed_emails:
+            return
+        if (
+            not force
+            and len(sent_emails) + len(failed_emails) < checkpoint_size
+            and time.monotonic() - checkpointed_at < checkpoint_interval
+        ):
+            return
+        counts = _update_statuses(held_leases, sent_emails, failed_emails, log_level)
+        totals[:] = [total + count for total, count in zip(totals, counts)]
+        sent_emails.clear()
+        failed_emails.clear()
+        checkpointed_at = time.monotonic()
+
+    def deliver(emails: Sequence[Email], pool, run_task, send_email, send_chunk, number_of_slots: int) -> int:
+        """
+        Sends ``emails`` with ``pool``, returns the number of sends that timed out.
+        """
+        # Emails are prepared while earlier ones are being sent. At most this many
+        # prepared messages are held in memory, rather than the whole batch.
+        prepared_slots = threading.BoundedSemaphore(number_of_slots)
+        # Prepared emails per backend alias, waiting to be sent together, see CHUNK_SIZE
+        chunks = {}
+        tasks = deque()
+        release_lock = threading.Lock()
+        num_timed_out = 0
+
+        def release(task, timed_out=False) -> bool:
+            # Called once the task is done, or when it's given up on, whichever comes first
+            with release_lock:
+                if task.released:
+                    return False
+                task.released = True
+                task.timed_out = timed_out
+            for email in task.emails:
+                prepared_slots.release()
+                if scheduler is not None:
+                    scheduler.release(email)
+            return True
+
+        def submit(emails):
+            task = _SendTask(emails)
+            if len(emails) == 1 and not batch_backends[emails[0].backend_alias or 'default']:
+                send, args = send_email, (emails[0], log_level)
+            else:
+                send, args = send_chunk, (emails, log_level)
+            task.result = pool.apply_async(run_task, args=(task, send, *args), callback=lambda _: release(task))
+            tasks.append(task)
+
+        def expire_tasks() -> float:
+            """
+            Gives up on sends that are running for longer than SEND_TIMEOUT. Their emails are
+            failed, the rest of the batch goes on. Returns the seconds until the next deadline.
+            """
+            nonlocal num_timed_out
+            now = time.monotonic()
+            until_next_deadline = math.inf
+            for task in tasks:
+                if task.released or task.started_at is None:
+                    continue
+                deadline = task.started_at + send_timeout
+                if deadline > now:
+                    until_next_deadline = min(until_next_deadline, deadline - now)
+                elif release(task, timed_out=True):
+                    logger.error(
+                        'Gave up on sending emails %s after %s seconds',
+                        ', '.join(f'#{email.id}' for email in task.emails),
+                        send_timeout,
+                    )
+                    # Only the asyncio engine can actually cancel a send
+                    if hasattr(task.result, 'cancel'):
+                        task.result.cancel()
+                    num_timed_out += 1
+            return until_next_deadline
+
+        def wait(ready) -> bool:
+            """
+            Waits until ``ready(seconds)`` returns True, giving up on sends that time out in the
+            meantime. Only if no send is even running for ``timeout`` seconds, e.g. because all
+            sending threads are stuck, the batch is aborted.
+            """
+            stalled_since = time.monotonic()
+            while True:
+                renew_leases()
+                until_next_deadline = expire_tasks()
+                now = time.monotonic()
+                if until_next_deadline < math.inf:
+                    # A send is running, it finishes or times out by its deadline
+                    stalled_since = now
+                elif now - stalled_since >= timeout:
+                    if ready(0):
+                        return
+                    raise TimeoutError(f'No email was sent in the last {timeout} seconds')
+                if ready(min(until_next_deadline, timeout - (now - stalled_since), 1)):
+                    return
+
+        def wait_for_task(task):
+            def ready(seconds):
+                if task.timed_out:
+                    return True
+                task.result.wait(seconds)
+                return task.result.ready()
+
+            if not task.result.ready():
+                wait(ready)
+
+        def wait_for_slot():
+            wait(lambda seconds: prepared_slots.acquire(timeout=seconds))
+
+        def collect(wait):
+            # Results are collected in order
+            while tasks and (wait or tasks[0].released or tasks[0].result.ready()):
+                task = tasks[0]
+                wait_for_task(task)
+                tasks.popleft()
+                renew_leases()
+                if task.timed_out:
+                    exception = TimeoutError(f'Email was not sent within {send_timeout} seconds')
+                    outcome = [(False, exception)] * len(task.emails)
+                else:
+                    outcome = task.result.get(timeout=timeout)
+                # send_chunk returns a list of outcomes, send_email a single one
+                if not isinstance(outcome, list):
+                    outcome = [outcome]
+                for email, (success, exception) in zip(task.emails, outcome):
+                    if success:
+                        sent_emails.append(email)
+                    else:
+                        failed_emails.append((email, exception))
+                checkpoint()
+
+        def flush() -> float:
+            # Emails waiting for their chunk to fill up may hold the slots (or the domain limits)
+            # the next email is waiting for, send them as they are
+            for alias in list(chunks):
+                submit(chunks.pop(alias))
+            return expire_tasks()
+
+        # Holds back emails to recipient domains that are at their limits, see DOMAIN_LIMITS
+        scheduler = get_domain_scheduler()
+        scheduled_emails = scheduler.schedule(emails, timeout, on_wait=flush) if scheduler else iter(emails)
+
+        while True:
+            if not prepared_slots.acquire(blocking=False):
+                flush()
+                wait_for_slot()
+            email = next(scheduled_emails, None)
+            if email is None:
+                prepared_slots.release()
+                break
+            renew_leases()
+
+            # Prepare emails in this thread, so we don't need to access the DB from within threads.
+            # Sometimes this can fail, for example when trying to render
+            # email from a faulty Django template
+            try:
+                email.prepare_email_message()
+            except Exception as e:
+                prepared_slots.release()
+                if scheduler is not None:
+                    scheduler.release(email)
+                logger.exception(f'Failed to prepare email #{email.id}')
+                failed_emails.append((email, e))
+                continue
+
+            alias = email.backend_alias or 'default'
+            chunk = chunks.setdefault(alias, [])
+            chunk.append(email)
+            if len(chunk) >= chunk_sizes[alias]:
+                submit(chunks.pop(alias))
+            collect(wait=False)
+        flush()
+
+        # Wait for all tasks to complete
+        collect(wait=True)
+        return num_timed_out
+
+    aliases = {email.backend_alias or 'default' for email in emails}
+    chunk_sizes = {alias: get_chunk_size(alias) for alias in aliases}
+    # Sent with send_batch() even one by one, to get their provider message IDs
+    batch_backends = {alias: is_batch_backend(alias) for alias in aliases}
+    max_chunk_size = max(chunk_sizes.values(), default=1)
+
+    if engine is None:
+        engine = get_sending_engine()
+    try:
+        if engine == 'asyncio':
+            # Backends without asend_messages() are sent by threads below
+            async_emails = [email for email in emails if is_async_backend(email.backend_alias or 'default')]
+            emails = [email for email in emails if not is_async_backend(email.backend_alias or 'default')]
+            if async_emails:
+                with AsyncioPool() as pool:
+                    number_of_slots = get_async_concurrency() * max_chunk_size
+                    deliver(async_emails, pool, run_task_async, send_email_async, send_emails_async, number_of_slots)
+
+        if emails:
+            _send_with_threads(emails, deliver, persistent, max_chunk_size)
+    finally:
+        # Also records the emails sent before a timeout
+        checkpoint(force=True)
+
+    num_sent, num_failed, num_requeued = totals
+    logger.info(
+        'Process finished, %s attempted, %s sent, %s failed, %s requeued',
+        email_count,
+        num_sent,
+        num_failed,
+        num_requeued,
+    )
+    return num_sent, num_failed, num_requeued
 
-    # Prepare emails before we send these to threads for sending
-    # So we don't need to access the DB from within threads
-    for email in emails:
-        # Sometimes this can fail, for example when trying to render
-        # email from a faulty Django template
-        try:
-            email.prepare_email_message()
-            emails_to_send.append(email)
-        except Exception as e:
-            logger.exception(f'Failed to prepare email #{email.id}')
-            failed_emails.append((email, e))
 
-    number_of_threads = min(get_threads_per_process(), email_count)
+def _send_with_threads(emails: Sequence[Email], deliver, persistent: bool, max_chunk_size: int) -> None:
     try:
-        with ThreadPool(number_of_threads) as pool:
-            results = []
-            for email in emails_to_send:
-                results.append((email, pool.apply_async(_send_email, args=(email, log_level))))
-
-            timeout = get_batch_delivery_timeout()
-
-            # Wait for all tasks to complete with a timeout
-            # The get method is used with a timeout to wait for each result
-            for email, result in results:
-                success, exception = result.get(timeout=timeout)
-                if success:
-                    sent_emails.append(email)
-                else:
-                    failed_emails.append((email, exception))
+        if persistent:
+            # Threads and their backend connections are kept alive for the next batch
+            pool, number_of_threads = _get_thread_pool()
+            thread_pool = nullcontext(pool)
+        else:
+            number_of_threads = min(get_threads_per_process(), len(emails))
+            thread_pool = ThreadPool(number_of_threads)
+
+        with thread_pool as pool:
+            num_timed_out = deliver(
+                emails, pool, _run_task, _send_email, _send_emails, number_of_threads * 2 * max_chunk_size
+            )
+        if persistent and num_timed_out:
+            # Threads that timed out may still be stuck sending, start new ones for the next batch
+            _discard_thread_pool()
+    except TimeoutError:
+        if persistent:
+            # Threads may still be stuck sending, start new ones for the next batch
+            _discard_thread_pool()
+        raise
     finally:
-        connections.close()
+        if not persistent:
+            connections.close()
 
-    # Update statuses of sent emails
-    email_ids = [email.id for email in sent_emails]
-    Email.objects.filter(id__in=email_ids).update(status=STATUS.sent, last_updated=timezone.now())
+
+def _update_statuses(
+    held_leases: QuerySet[Email],
+    sent_emails: list[Email],
+    failed_emails: list[tuple[Email, Exception]],
+    log_level: int,
+) -> tuple[int, int, int]:
+    # Update statuses of sent emails. Emails whose lease was lost are left alone,
+    # they are now owned by another worker.
+    email_ids = [email.id for email in sent_emails if not email.provider_message_id]
+    num_updated = held_leases.filter(id__in=email_ids).update(
+        status=STATUS.sent, lease_owner='', lease_expires_at=None, last_updated=timezone.now()
+    )
+    # Emails sent with send_batch() also store the ID their provider assigned to them
+    emails_with_provider_ids = [email for email in sent_emails if email.provider_message_id]
+    for email in emails_with_provider_ids:
+        email.status = STATUS.sent
+        email.lease_owner = ''
+        email.lease_expires_at = None
+        email.last_updated = timezone.now()
+    num_updated += held_leases.bulk_update(
+        emails_with_provider_ids, ['status', 'provider_message_id', 'lease_owner', 'lease_expires_at', 'last_updated']
+    )
 
     # Update statuses and conditionally requeue failed emails
     num_failed, num_requeued = 0, 0
     max_retries = get_max_retries()
-    scheduled_time = timezone.now() + get_retry_timedelta()
+    now = timezone.now()
     emails_failed = [email for email, _ in failed_emails]
 
     for email in emails_failed:
@@ -416,14 +1215,24 @@ def _send_bulk(
         if email.number_of_retries < max_retries:
             email.number_of_retries += 1
             email.status = STATUS.requeued
-            email.scheduled_time = scheduled_time
+            email.scheduled_time = now + get_retry_delay(email.number_of_retries)
             num_requeued += 1
         else:
             email.status = STATUS.failed
             num_failed += 1
+        email.lease_owner = ''
+        email.lease_expires_at = None
         email.last_updated = timezone.now()
 
-    Email.objects.bulk_update(emails_failed, ['status', 'scheduled_time', 'number_of_retries', 'last_updated'])
+    num_updated += held_leases.bulk_update(
+        emails_failed,
+        ['status', 'scheduled_time', 'number_of_retries', 'lease_owner', 'lease_expires_at', 'last_updated'],
+    )
+    if num_updated < len(sent_emails) + len(emails_failed):
+        logger.warning(
+            'Lost the lease of %s emails while sending, their statuses were not updated',
+            len(sent_emails) + len(emails_failed) - num_updated,
+        )
 
     # If log level is 0, log nothing, 1 logs only sending failures
     # and 2 means log both successes and failures
@@ -450,38 +1259,235 @@ def _send_bulk(
         if logs:
             Log.objects.bulk_create(logs)
 
-    logger.info(
-        'Process finished, %s attempted, %s sent, %s failed, %s requeued',
-        email_count,
-        len(sent_emails),
-        num_failed,
-        num_requeued,
-    )
-
     return len(sent_emails), num_failed, num_requeued
 
 
 def send_queued_mail_until_done(
-    lockfile: str = default_lockfile, processes: int = 1, log_level: Optional[int] = None
+    lockfile: str = default_lockfile,
+    processes: int = 1,
+    log_level: Optional[int] = None,
+    engine: Optional[str] = None,
+    priorities: Optional[Sequence[int]] = None,
 ) -> None:
     """
     Send mail in queue batch by batch, until all emails have been processed.
+    If ``priorities`` is given, only emails with these priorities are sent.
+    """
+    _run_with_lock(lockfile, _send_queued_until_done, processes, log_level, engine, priorities)
+
+
+def send_queued_mail_forever(
+    lockfile: str = default_lockfile,
+    processes: int = 1,
+    log_level: Optional[int] = None,
+    stop_event: Optional[threading.Event] = None,
+    engine: Optional[str] = None,
+    priorities: Optional[Sequence[int]] = None,
+) -> None:
     """
+    Keep sending queued mail until SIGTERM or SIGINT is received, or until
+    ``stop_event`` is set. The batch being sent is always finished first.
+
+    After a batch is sent, the queue is polled again right away. While the
+    queue is empty, the interval between polls doubles from
+    ``MIN_POLL_INTERVAL`` up to ``MAX_POLL_INTERVAL``, or up to
+    ``NOTIFY_POLL_INTERVAL`` while listening for queued emails.
+
+    If ``priorities`` is given, only emails with these priorities are sent, so
+    that e.g. a worker dedicated to high priority emails never waits for a
+    batch of low priority ones.
+    """
+    if stop_event is None:
+        stop_event = threading.Event()
+
+    with _stop_on_signals(stop_event):
+        _run_with_lock(lockfile, _send_queued_forever, processes, log_level, stop_event, engine, priorities)
+
+
+def _check_lease_duration() -> None:
+    for timeout_setting, timeout in [
+        ('BATCH_DELIVERY_TIMEOUT', get_batch_delivery_timeout()),
+        ('SEND_TIMEOUT', get_send_timeout()),
+    ]:
+        if get_lease_duration().total_seconds() <= timeout:
+            raise ImproperlyConfigured(
+                f'POST_OFFICE["LEASE_DURATION"] must be longer than POST_OFFICE["{timeout_setting}"], '
+                'otherwise emails may be requeued while they are being sent.'
+            )
+
+
+def _run_with_lock(lockfile: str, func, *args) -> None:
+    _check_lease_duration()
+    if supports_row_locking():
+        # Rows are locked individually, any number of senders may run at once
+        logger.info('Row locking is enabled, sending queued emails without acquiring %s.lock', lockfile)
+        func(*args)
+        return
+
     try:
         with FileLock(lockfile):
             logger.info('Acquired lock for sending queued emails at %s.lock', lockfile)
-            while True:
-                try:
-                    send_queued(processes, log_level)
-                except Exception as e:
-                    connections.close()
-                    logger.exception(e, extra={'status_code': 500})
-                    raise
-
-                # Close DB connection to avoid multiprocessing errors
-                db_connection.close()
-
-                if not get_queued().exists():
-                    break
+            func(*args)
     except FileLocked:
         logger.info('Failed to acquire lock, terminating now.')
+
+
+def _send_queued_until_done(
+    processes: int, log_level: Optional[int], engine: Optional[str], priorities: Optional[Sequence[int]] = None
+) -> None:
+    with _worker_pool(processes) as worker_pool:
+        _send_batches_until_done(processes, log_level, worker_pool, engine, priorities)
+
+
+def _send_batches_until_done(
+    processes: int,
+    log_level: Optional[int],
+    worker_pool: Optional[WorkerPool],
+    engine: Optional[str],
+    priorities: Optional[Sequence[int]] = None,
+) -> None:
+    batch_sizer = get_batch_sizer()
+    while True:
+        started_at = time.monotonic()
+        try:
+            results = send_queued(
+                processes, log_level, worker_pool, engine, priorities, batch_sizer.size if batch_sizer else None
+            )
+        except Exception as e:
+            connections.close()
+            logger.exception(e, extra={'status_code': 500})
+            raise
+
+        if batch_sizer is not None:
+            _, total_failed, total_requeued = results
+            batch_sizer.record(sum(results), total_failed + total_requeued, time.monotonic() - started_at)
+            logger.debug('Adapted the batch size to %s emails', batch_sizer.size)
+
+        if worker_pool is None:
+            # Close DB connection to avoid multiprocessing errors
+            db_connection.close()
+
+        if supports_row_locking():
+            # Queued emails may still exist while other workers hold their locks,
+            # stop once there's nothing left for this worker to claim
+            if not sum(results):
+                break
+        elif not get_queued(priorities=priorities).exists():
+            break
+
+
+def _send_queued_forever(
+    processes: int,
+    log_level: Optional[int],
+    stop_event: threading.Event,
+    engine: Optional[str],
+    priorities: Optional[Sequence[int]] = None,
+) -> None:
+    with _worker_pool(processes) as worker_pool:
+        _poll_queue(processes, log_level, stop_event, worker_pool, engine, priorities)
+
+    logger.info('Stopped sending queued emails.')
+
+
+def _poll_queue(
+    processes: int,
+    log_level: Optional[int],
+    stop_event: threading.Event,
+    worker_pool: Optional[WorkerPool],
+    engine: Optional[str],
+    priorities: Optional[Sequence[int]] = None,
+) -> None:
+    min_interval = get_min_poll_interval()
+    max_interval = get_max_poll_interval()
+    # With a listener, polling is only needed for scheduled and requeued emails
+    notify_interval = max(get_notify_poll_interval(), max_interval)
+    interval = min_interval
+    listener = _listen_for_queued_emails()
+
+    try:
+        while not stop_event.is_set():
+            try:
+                results = send_queued(processes, log_level, worker_pool, engine, priorities)
+            except Exception as e:
+                # Keep running, but back off as if the queue were empty
+                connections.close()
+                db_connection.close()
+                logger.exception(e, extra={'status_code': 500})
+                results = (0, 0, 0)
+            else:
+                if processes > 1 and worker_pool is None:
+                    # Close DB connection to avoid multiprocessing errors
+                    db_connection.close()
+                else:
+                    close_old_connections()
+
+            if sum(results):
+                interval = min_interval
+                continue
+
+            if listener is None and get_notify_enabled():
+                # Reconnect after the listener's connection was lost
+                listener = _listen_for_queued_emails()
+
+            if listener is None:
+                stop_event.wait(interval)
+                interval = min(interval * 2, max_interval)
+                continue
+
+            try:
+                notified = listener.wait(interval)
+            except Exception:
+                # e.g. the server was restarted, poll until the listener is reconnected
+                logger.exception('Stopped listening for queued emails')
+                _close_listener(listener)
+                listener = None
+                stop_event.wait(interval)
+                interval = min(interval * 2, max_interval)
+                continue
+
+            if notified:
+                # Woken up by newly queued emails
+                interval = min_interval
+                continue
+            interval = min(interval * 2, notify_interval)
+    finally:
+        if listener is not None:
+            _close_listener(listener)
+
+
+def _listen_for_queued_emails() -> Optional[QueueListener]:
+    try:
+        return get_queue_listener()
+    except Exception:
+        logger.exception('Failed to listen for queued emails, polling instead')
+        return None
+
+
+def _close_listener(listener: QueueListener) -> None:
+    try:
+        listener.close()
+    except Exception:
+        # Its connection is most likely broken already
+        pass
+
+
+@contextmanager
+def _stop_on_signals(stop_event: threading.Event):
+    """
+    Sets ``stop_event`` when SIGTERM or SIGINT is received. Signal handlers
+    can only be installed from the main thread, elsewhere this does nothing.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def handler(signum, frame):
+        logger.info('Received %s, stopping after the current batch.', signal.Signals(signum).name)
+        stop_event.set()
+
+    previous_handlers = {signum: signal.signal(signum, handler) for signum in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        yield
+    finally:
+        for signum, previous_handler in previous_handlers.items():
+            signal.signal(signum, previous_handler)
@@ -0,0 +1,22 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from ...utils import archive_emails
+
+
+class Command(BaseCommand):
+    help = 'Move sent and failed mails to the archive tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-d', '--days', type=int, default=30, help='Archive mails sent before this many days, defaults to 30.'
+        )
+
+        parser.add_argument('-b', '--batch-size', type=int, default=1000, help='Batch size for archiving.')
+
+    def handle(self, verbosity, days, batch_size, **options):
+        cutoff_date = now() - datetime.timedelta(days)
+        num_emails = archive_emails(cutoff_date, batch_size)
+        self.stdout.write(f'Archived {num_emails} mails sent or failed before {cutoff_date}.')
@@ -1,7 +1,9 @@
 from django.core.management.base import BaseCommand
 
 from ...lockfile import default_lockfile
-from ...mail import send_queued_mail_until_done
+from ...mail import send_queued_mail_forever, send_queued_mail_until_done
+from ...models import PRIORITY
+from ...utils import parse_priority
 
 
 class Command(BaseCommand):
@@ -16,7 +18,6 @@ class Command(BaseCommand):
         parser.add_argument(
             '-L',
             '--lockfile',
-            default=default_lockfile,
             help='Absolute path of lockfile to acquire',
         )
         parser.add_argument(
@@ -25,6 +26,50 @@ class Command(BaseCommand):
             type=int,
             help='"0" to log nothing, "1" to only log errors',
         )
+        parser.add_argument(
+            '-d',
+            '--daemon',
+            action='store_true',
+            help='Keep running and polling the queue until SIGTERM is received',
+        )
+        parser.add_argument(
+            '-e',
+            '--engine',
+            choices=['threads', 'asyncio'],
+            help='Engine used to send emails, overrides the SENDING_ENGINE setting',
+        )
+        parser.add_argument(
+            '-P',
+            '--priority',
+            action='append',
+            choices=PRIORITY._fields,
+            help='Only send emails with this priority, may be given more than once',
+        )
 
     def handle(self, *args, **options):
-        send_queued_mail_until_done(options['lockfile'], options['processes'], options.get('log_level'))
+        priorities = None
+        lockfile = options.get('lockfile')
+        if options.get('priority'):
+            priorities = sorted({parse_priority(priority) for priority in options['priority']})
+            if lockfile is None:
+                # Workers of different priority lanes run side by side
+                lockfile = '-'.join([default_lockfile, *(PRIORITY._fields[priority] for priority in priorities)])
+        if lockfile is None:
+            lockfile = default_lockfile
+
+        if options['daemon']:
+            send_queued_mail_forever(
+                lockfile,
+                options['processes'],
+                options.get('log_level'),
+                engine=options.get('engine'),
+                priorities=priorities,
+            )
+        else:
+            send_queued_mail_until_done(
+                lockfile,
+                options['processes'],
+                options.get('log_level'),
+                engine=options.get('engine'),
+                priorities=priorities,
+            )
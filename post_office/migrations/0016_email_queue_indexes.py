@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post_office', '0015_email_lease'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(fields=['status', '-priority', 'scheduled_time'], name='post_office_email_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(condition=models.Q(('status__in', [2, 3])), fields=['-priority', 'scheduled_time'], name='post_office_email_queued_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post_office', '0016_email_queue_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='email',
+            name='post_office_email_queue_idx',
+        ),
+    ]
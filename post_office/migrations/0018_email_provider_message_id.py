@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post_office', '0017_remove_email_queue_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='email',
+            name='provider_message_id',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Provider message ID'),
+        ),
+    ]
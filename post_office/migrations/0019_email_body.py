@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post_office', '0018_email_provider_message_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailBody',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(editable=False, max_length=64, unique=True, verbose_name='Content hash')),
+                ('message', models.TextField(blank=True, verbose_name='Message')),
+                ('html_message', models.TextField(blank=True, verbose_name='HTML Message')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Email body',
+                'verbose_name_plural': 'Email bodies',
+            },
+        ),
+        migrations.AddField(
+            model_name='email',
+            name='body',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='emails', to='post_office.emailbody', verbose_name='Body'),
+        ),
+    ]
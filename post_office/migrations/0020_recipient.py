@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post_office', '0019_email_body'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recipient',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.CharField(db_index=True, max_length=254, verbose_name='Address')),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'To'), (2, 'Cc'), (3, 'Bcc')], default=1, verbose_name='Kind')),
+                ('delivery_status', models.PositiveSmallIntegerField(blank=True, choices=[(10, 'Accepted'), (20, 'Delivered'), (30, 'Opened'), (40, 'Clicked'), (50, 'Deferred'), (60, 'Soft Bounced'), (65, 'Undetermined Bounced'), (70, 'Hard Bounced'), (80, 'Spam Complaint'), (90, 'Unsubscribed')], null=True, verbose_name='Delivery Status')),
+                ('email', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='recipients', to='post_office.email', verbose_name='Email address')),
+            ],
+            options={
+                'verbose_name': 'Recipient',
+                'verbose_name_plural': 'Recipients',
+                'constraints': [models.UniqueConstraint(fields=('email', 'address'), name='post_office_recipient_unique')],
+            },
+        ),
+    ]
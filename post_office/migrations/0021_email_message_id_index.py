@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post_office', '0020_recipient'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='email',
+            name='message_id',
+            field=models.CharField(db_index=True, editable=False, max_length=255, null=True, verbose_name='Message-ID'),
+        ),
+        migrations.AlterField(
+            model_name='email',
+            name='provider_message_id',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255, verbose_name='Provider message ID'),
+        ),
+    ]
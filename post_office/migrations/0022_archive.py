@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:54
+
+import django.db.models.deletion
+import post_office.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post_office', '0021_email_message_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEmail',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('to', post_office.fields.CommaSeparatedEmailField(blank=True, verbose_name='Email To')),
+                ('cc', post_office.fields.CommaSeparatedEmailField(blank=True, verbose_name='Cc')),
+                ('bcc', post_office.fields.CommaSeparatedEmailField(blank=True, verbose_name='Bcc')),
+                ('subject', models.CharField(blank=True, max_length=989, verbose_name='Subject')),
+                ('message', models.TextField(blank=True, verbose_name='Message')),
+                ('html_message', models.TextField(blank=True, verbose_name='HTML Message')),
+                ('status', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'sent'), (1, 'failed'), (2, 'queued'), (3, 'requeued'), (4, 'sending')], null=True, verbose_name='Status')),
+                ('recipient_delivery_status', models.PositiveSmallIntegerField(blank=True, choices=[(10, 'Accepted'), (20, 'Delivered'), (30, 'Opened'), (40, 'Clicked'), (50, 'Deferred'), (60, 'Soft Bounced'), (65, 'Undetermined Bounced'), (70, 'Hard Bounced'), (80, 'Spam Complaint'), (90, 'Unsubscribed')], null=True, verbose_name='Recipient Delivery Status')),
+                ('priority', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'low'), (1, 'medium'), (2, 'high'), (3, 'now')], null=True, verbose_name='Priority')),
+                ('created', models.DateTimeField(db_index=True)),
+                ('last_updated', models.DateTimeField()),
+                ('scheduled_time', models.DateTimeField(blank=True, null=True, verbose_name='Scheduled Time')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Expires')),
+                ('message_id', models.CharField(db_index=True, max_length=255, null=True, verbose_name='Message-ID')),
+                ('provider_message_id', models.CharField(blank=True, default='', max_length=255, verbose_name='Provider message ID')),
+                ('number_of_retries', models.PositiveIntegerField(blank=True, null=True)),
+                ('headers', models.JSONField(blank=True, null=True, verbose_name='Headers')),
+                ('context', models.JSONField(blank=True, null=True, verbose_name='Context')),
+                ('backend_alias', models.CharField(blank=True, default='', max_length=64, verbose_name='Backend alias')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archived at')),
+                ('attachments', models.ManyToManyField(blank=True, related_name='archived_emails', to='post_office.attachment', verbose_name='Attachments')),
+                ('body', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archived_emails', to='post_office.emailbody')),
+                ('template', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='post_office.emailtemplate', verbose_name='Email template')),
+            ],
+            options={
+                'verbose_name': 'Archived email',
+                'verbose_name_plural': 'Archived emails',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedLog',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateTimeField()),
+                ('status', models.PositiveSmallIntegerField(choices=[(0, 'sent'), (1, 'failed'), (10, 'Accepted'), (20, 'Delivered'), (30, 'Opened'), (40, 'Clicked'), (50, 'Deferred'), (60, 'Soft Bounced'), (65, 'Undetermined Bounced'), (70, 'Hard Bounced'), (80, 'Spam Complaint'), (90, 'Unsubscribed')], verbose_name='Status')),
+                ('exception_type', models.CharField(blank=True, max_length=255, verbose_name='Exception type')),
+                ('message', models.TextField(verbose_name='Message')),
+                ('email', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='logs', to='post_office.archivedemail', verbose_name='Email address')),
+            ],
+            options={
+                'verbose_name': 'Archived log',
+                'verbose_name_plural': 'Archived logs',
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:55
+
+import post_office.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post_office', '0022_archive'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedemail',
+            name='html_message',
+            field=post_office.fields.CompressedTextField(blank=True, verbose_name='HTML Message'),
+        ),
+        migrations.AlterField(
+            model_name='archivedemail',
+            name='message',
+            field=post_office.fields.CompressedTextField(blank=True, verbose_name='Message'),
+        ),
+        migrations.AlterField(
+            model_name='email',
+            name='html_message',
+            field=post_office.fields.CompressedTextField(blank=True, verbose_name='HTML Message'),
+        ),
+        migrations.AlterField(
+            model_name='email',
+            name='message',
+            field=post_office.fields.CompressedTextField(blank=True, verbose_name='Message'),
+        ),
+        migrations.AlterField(
+            model_name='emailbody',
+            name='html_message',
+            field=post_office.fields.CompressedTextField(blank=True, verbose_name='HTML Message'),
+        ),
+        migrations.AlterField(
+            model_name='emailbody',
+            name='message',
+            field=post_office.fields.CompressedTextField(blank=True, verbose_name='Message'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post_office', '0023_compressed_text_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64, verbose_name='Content hash'),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='key',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=255, verbose_name='Key'),
+        ),
+    ]
@@ -1,18 +1,23 @@
+import hashlib
+import json
+import mimetypes
 import os
 
 from collections import namedtuple
 from uuid import uuid4
 from email.mime.nonmultipart import MIMENonMultipart
+from email.utils import parseaddr
 
 from django.core.exceptions import ValidationError
 from django.core.mail import EmailMessage, EmailMultiAlternatives
+from django.core.mail.message import DEFAULT_ATTACHMENT_MIME_TYPE
 from django.db import models
 from django.utils.encoding import smart_str
 from django.utils.translation import pgettext_lazy, gettext_lazy as _
 from django.utils import timezone
 
 from post_office import cache
-from post_office.fields import CommaSeparatedEmailField
+from post_office.fields import CommaSeparatedEmailField, CompressedTextField
 
 from .connections import connections
 from .logutils import setup_loghandlers
@@ -24,7 +29,7 @@ logger = setup_loghandlers('INFO')
 
 
 PRIORITY = namedtuple('PRIORITY', 'low medium high now')._make(range(4))
-STATUS = namedtuple('STATUS', 'sent failed queued requeued')._make(range(4))
+STATUS = namedtuple('STATUS', 'sent failed queued requeued sending')._make(range(5))
 
 
 class RecipientDeliveryStatus(models.IntegerChoices):
@@ -58,6 +63,7 @@ class Email(models.Model):
         (STATUS.failed, _('failed')),
         (STATUS.queued, _('queued')),
         (STATUS.requeued, _('requeued')),
+        (STATUS.sending, _('sending')),
     ]
 
     from_email = models.CharField(_('Email From'), max_length=254, validators=[validate_email_with_name])
@@ -65,12 +71,13 @@ class Email(models.Model):
     cc = CommaSeparatedEmailField(_('Cc'))
     bcc = CommaSeparatedEmailField(_('Bcc'))
     subject = models.CharField(_('Subject'), max_length=989, blank=True)
-    message = models.TextField(_('Message'), blank=True)
-    html_message = models.TextField(_('HTML Message'), blank=True)
+    message = CompressedTextField(_('Message'), blank=True)
+    html_message = CompressedTextField(_('HTML Message'), blank=True)
     """
     Emails with 'queued' status will get processed by ``send_queued`` command.
-    Status field will then be set to ``failed`` or ``sent`` depending on
-    whether it's successfully delivered.
+    While being delivered, status is set to ``sending`` and the email is leased
+    to the worker sending it. Status field will then be set to ``failed`` or
+    ``sent`` depending on whether it's successfully delivered.
     """
     status = models.PositiveSmallIntegerField(_('Status'), choices=STATUS_CHOICES, db_index=True, blank=True, null=True)
     recipient_delivery_status = models.PositiveSmallIntegerField(
@@ -85,19 +92,46 @@ class Email(models.Model):
     expires_at = models.DateTimeField(
         _('Expires'), blank=True, null=True, help_text=_("Email won't be sent after this timestamp")
     )
-    message_id = models.CharField('Message-ID', null=True, max_length=255, editable=False)
+    # Both message IDs are indexed to match webhook events to emails, see post_office.webhooks
+    message_id = models.CharField('Message-ID', null=True, max_length=255, editable=False, db_index=True)
+    # Set by backends implementing send_batch(), see post_office.backends.SendResult
+    provider_message_id = models.CharField(
+        _('Provider message ID'), blank=True, default='', max_length=255, editable=False, db_index=True
+    )
     number_of_retries = models.PositiveIntegerField(null=True, blank=True)
     headers = models.JSONField(_('Headers'), blank=True, null=True)
     template = models.ForeignKey(
         'post_office.EmailTemplate', blank=True, null=True, verbose_name=_('Email template'), on_delete=models.CASCADE
     )
+    # Holds message and html_message instead of this email with DEDUPLICATE_BODIES
+    body = models.ForeignKey(
+        'post_office.EmailBody',
+        blank=True,
+        null=True,
+        related_name='emails',
+        verbose_name=_('Body'),
+        on_delete=models.PROTECT,
+        editable=False,
+    )
     context = context_field_class(_('Context'), blank=True, null=True)
     backend_alias = models.CharField(_('Backend alias'), blank=True, default='', max_length=64)
+    lease_owner = models.CharField(_('Lease owner'), blank=True, default='', max_length=255, editable=False)
+    lease_expires_at = models.DateTimeField(_('Lease expires at'), blank=True, null=True, db_index=True, editable=False)
 
     class Meta:
         app_label = 'post_office'
         verbose_name = pgettext_lazy('Email address', 'Email')
         verbose_name_plural = pgettext_lazy('Email addresses', 'Emails')
+        indexes = [
+            # Used by get_queued(), so that claiming a batch only ever touches queued emails
+            # and the default sending order is read straight off this index. Databases
+            # without partial indexes fall back to the index on status.
+            models.Index(
+                fields=['-priority', 'scheduled_time'],
+                condition=models.Q(status__in=[STATUS.queued, STATUS.requeued]),
+                name='post_office_email_queued_idx',
+            ),
+        ]
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -135,9 +169,13 @@ class Email(models.Model):
 
         else:
             subject = smart_str(self.subject)
-            plaintext_message = self.message
             multipart_template = None
-            html_message = self.html_message
+            if self.body_id is not None:
+                plaintext_message = self.body.message
+                html_message = self.body.html_message
+            else:
+                plaintext_message = self.message
+                html_message = self.html_message
 
         connection = connections[self.backend_alias or 'default']
         if isinstance(self.headers, dict) or self.expires_at or self.message_id:
@@ -199,9 +237,10 @@ class Email(models.Model):
                     except KeyError:
                         mime_part.add_header(key, val)
                 msg.attach(mime_part)
+                attachment.file.close()
             else:
-                msg.attach(attachment.name, attachment.file.read(), mimetype=attachment.mimetype or None)
-            attachment.file.close()
+                # Read when the message is sent, not while it waits in a prepared batch
+                msg.attachments.append(LazyAttachment(attachment))
 
         self._cached_email_message = msg
         return msg
@@ -288,6 +327,82 @@ class Log(models.Model):
         return str(self.date)
 
 
+class Recipient(models.Model):
+    """
+    A recipient of an email, stored next to ``Email.to``, ``cc`` and ``bcc`` when
+    ``STORE_RECIPIENTS`` is enabled, so that emails can be looked up by address
+    and delivery statuses can be tracked per recipient.
+    """
+
+    class Kind(models.IntegerChoices):
+        TO = 1, _('To')
+        CC = 2, _('Cc')
+        BCC = 3, _('Bcc')
+
+    email = models.ForeignKey(
+        Email, editable=False, related_name='recipients', verbose_name=_('Email address'), on_delete=models.CASCADE
+    )
+    # Lowercased, without the display name
+    address = models.CharField(_('Address'), max_length=254, db_index=True)
+    kind = models.PositiveSmallIntegerField(_('Kind'), choices=Kind.choices, default=Kind.TO)
+    delivery_status = models.PositiveSmallIntegerField(
+        _('Delivery Status'), choices=RecipientDeliveryStatus.choices, blank=True, null=True
+    )
+
+    class Meta:
+        app_label = 'post_office'
+        verbose_name = _('Recipient')
+        verbose_name_plural = _('Recipients')
+        constraints = [
+            models.UniqueConstraint(fields=['email', 'address'], name='post_office_recipient_unique'),
+        ]
+
+    def __str__(self):
+        return self.address
+
+    @staticmethod
+    def normalize_address(address: str) -> str:
+        return parseaddr(address)[1].lower()
+
+    @classmethod
+    def for_email(cls, email: Email) -> list['Recipient']:
+        """
+        Returns the unsaved recipients of ``email``, an address listed more than once is only included once.
+        """
+        recipients = {}
+        for kind, addresses in [(cls.Kind.TO, email.to), (cls.Kind.CC, email.cc), (cls.Kind.BCC, email.bcc)]:
+            for address in addresses or []:
+                address = cls.normalize_address(address)
+                if address and address not in recipients:
+                    recipients[address] = cls(email=email, address=address, kind=kind)
+        return list(recipients.values())
+
+
+class EmailBody(models.Model):
+    """
+    The message and html_message of emails, stored once for all emails with
+    the same content when ``DEDUPLICATE_BODIES`` is enabled.
+    """
+
+    content_hash = models.CharField(_('Content hash'), max_length=64, unique=True, editable=False)
+    message = CompressedTextField(_('Message'), blank=True)
+    html_message = CompressedTextField(_('HTML Message'), blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        app_label = 'post_office'
+        verbose_name = _('Email body')
+        verbose_name_plural = _('Email bodies')
+
+    def __str__(self):
+        return self.content_hash
+
+    @staticmethod
+    def get_content_hash(message: str, html_message: str) -> str:
+        content = f'{len(message)}:{message}{html_message}'
+        return hashlib.sha256(content.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
 class EmailTemplateManager(models.Manager):
     def get_by_natural_key(self, name, language, default_template):
         return self.get(name=name, language=language, default_template=default_template)
@@ -368,6 +483,11 @@ class Attachment(models.Model):
     emails = models.ManyToManyField(Email, related_name='attachments', verbose_name=_('Emails'))
     mimetype = models.CharField(max_length=255, default='', blank=True)
     headers = models.JSONField(_('Headers'), blank=True, null=True)
+    # Identify attachments that are reused instead of stored again, see create_attachments()
+    content_hash = models.CharField(
+        _('Content hash'), max_length=64, blank=True, default='', db_index=True, editable=False
+    )
+    key = models.CharField(_('Key'), max_length=255, blank=True, default='', db_index=True)
 
     class Meta:
         app_label = 'post_office'
@@ -376,3 +496,160 @@ class Attachment(models.Model):
 
     def __str__(self):
         return self.name
+
+    @staticmethod
+    def get_content_hash(content, name: str, mimetype: str, headers) -> str:
+        """
+        Returns the hash of the file-like ``content`` along with the name, mimetype and headers it's attached with.
+        """
+        content_hash = hashlib.sha256()
+        content_hash.update(json.dumps([name, mimetype, headers], sort_keys=True).encode())
+        for chunk in content.chunks():
+            content_hash.update(chunk if isinstance(chunk, bytes) else chunk.encode())
+        return content_hash.hexdigest()
+
+
+class LazyAttachment(tuple):
+    """
+    The ``(filename, content, mimetype)`` tuple of an ``Attachment`` in
+    ``EmailMessage.attachments``, whose content is only read from storage when
+    it's used, e.g. by ``EmailMessage.message()`` when the email is sent.
+    """
+
+    def __new__(cls, attachment: Attachment):
+        mimetype = attachment.mimetype or mimetypes.guess_type(attachment.name)[0] or DEFAULT_ATTACHMENT_MIME_TYPE
+        instance = super().__new__(cls, (attachment.name, None, mimetype))
+        instance.attachment = attachment
+        return instance
+
+    def load(self) -> tuple:
+        """
+        Reads the file, returns the tuple ``EmailMessage.attach()`` would have added.
+        """
+        filename, _, mimetype = tuple.__iter__(self)
+        file = self.attachment.file
+        file.open('rb')
+        try:
+            content = b''.join(file.chunks())
+        finally:
+            file.close()
+        if mimetype.split('/')[0] == 'text':
+            try:
+                content = content.decode()
+            except UnicodeDecodeError:
+                mimetype = DEFAULT_ATTACHMENT_MIME_TYPE
+        return filename, content, mimetype
+
+    @property
+    def filename(self):
+        return tuple.__getitem__(self, 0)
+
+    @property
+    def content(self):
+        return self.load()[1]
+
+    @property
+    def mimetype(self):
+        return self.load()[2]
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __getitem__(self, index):
+        return self.load()[index]
+
+    def __eq__(self, other):
+        return self.load() == other
+
+    def __reduce__(self):
+        # Copied and pickled as the Attachment it's created from
+        return self.__class__, (self.attachment,)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.filename!r})'
+
+
+class ArchivedEmail(models.Model):
+    """
+    A sent or failed email moved out of the ``Email`` table by the
+    ``archive_mail`` command, keeping its id. Archived emails are read only.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    from_email = models.CharField(_('Email From'), max_length=254)
+    to = CommaSeparatedEmailField(_('Email To'))
+    cc = CommaSeparatedEmailField(_('Cc'))
+    bcc = CommaSeparatedEmailField(_('Bcc'))
+    subject = models.CharField(_('Subject'), max_length=989, blank=True)
+    message = CompressedTextField(_('Message'), blank=True)
+    html_message = CompressedTextField(_('HTML Message'), blank=True)
+    body = models.ForeignKey(
+        EmailBody, blank=True, null=True, related_name='archived_emails', on_delete=models.PROTECT
+    )
+    status = models.PositiveSmallIntegerField(_('Status'), choices=Email.STATUS_CHOICES, blank=True, null=True)
+    recipient_delivery_status = models.PositiveSmallIntegerField(
+        _('Recipient Delivery Status'), choices=RecipientDeliveryStatus.choices, blank=True, null=True
+    )
+    priority = models.PositiveSmallIntegerField(_('Priority'), choices=Email.PRIORITY_CHOICES, blank=True, null=True)
+    created = models.DateTimeField(db_index=True)
+    last_updated = models.DateTimeField()
+    scheduled_time = models.DateTimeField(_('Scheduled Time'), blank=True, null=True)
+    expires_at = models.DateTimeField(_('Expires'), blank=True, null=True)
+    message_id = models.CharField('Message-ID', null=True, max_length=255, db_index=True)
+    provider_message_id = models.CharField(_('Provider message ID'), blank=True, default='', max_length=255)
+    number_of_retries = models.PositiveIntegerField(null=True, blank=True)
+    headers = models.JSONField(_('Headers'), blank=True, null=True)
+    template = models.ForeignKey(
+        EmailTemplate, blank=True, null=True, verbose_name=_('Email template'), on_delete=models.SET_NULL
+    )
+    context = context_field_class(_('Context'), blank=True, null=True)
+    backend_alias = models.CharField(_('Backend alias'), blank=True, default='', max_length=64)
+    attachments = models.ManyToManyField(
+        Attachment, related_name='archived_emails', verbose_name=_('Attachments'), blank=True
+    )
+    archived_at = models.DateTimeField(_('Archived at'), auto_now_add=True)
+
+    class Meta:
+        app_label = 'post_office'
+        verbose_name = _('Archived email')
+        verbose_name_plural = _('Archived emails')
+
+    def __str__(self):
+        return f'{", ".join(self.to)}'
+
+    @classmethod
+    def from_email(cls, email: Email) -> 'ArchivedEmail':
+        """
+        Returns an unsaved copy of ``email``.
+        """
+        field_names = {field.attname for field in cls._meta.concrete_fields}
+        return cls(
+            **{
+                field.attname: getattr(email, field.attname)
+                for field in Email._meta.concrete_fields
+                if field.attname in field_names
+            }
+        )
+
+
+class ArchivedLog(models.Model):
+    """
+    A log of an archived email, see ``ArchivedEmail``.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    email = models.ForeignKey(
+        ArchivedEmail, related_name='logs', verbose_name=_('Email address'), on_delete=models.CASCADE
+    )
+    date = models.DateTimeField()
+    status = models.PositiveSmallIntegerField(_('Status'), choices=Log.STATUS_CHOICES)
+    exception_type = models.CharField(_('Exception type'), max_length=255, blank=True)
+    message = models.TextField(_('Message'))
+
+    class Meta:
+        app_label = 'post_office'
+        verbose_name = _('Archived log')
+        verbose_name_plural = _('Archived logs')
+
+    def __str__(self):
+        return str(self.date)
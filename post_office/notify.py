@@ -0,0 +1,102 @@
+"""
+Wakes up ``send_queued_mail --daemon`` as soon as emails are queued, using
+PostgreSQL's LISTEN/NOTIFY. On other databases, the daemon falls back to polling.
+"""
+
+import inspect
+import select
+
+from django.db import connections as db_connections, router
+
+from .logutils import setup_loghandlers
+from .models import Email
+from .settings import get_notify_channel, get_notify_enabled
+
+logger = setup_loghandlers('INFO')
+
+
+def supports_notify(connection) -> bool:
+    return connection.vendor == 'postgresql'
+
+
+def notify_email_queued(sender, emails, **kwargs):
+    """
+    Connected to :data:`post_office.signals.email_queued` when ``NOTIFY_ENABLED``
+    is set. PostgreSQL only delivers the notification once the transaction
+    that queued the emails is committed.
+    """
+    connection = db_connections[router.db_for_write(Email)]
+    if not supports_notify(connection):
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [get_notify_channel(), str(len(emails))])
+
+
+def get_queue_listener():
+    """
+    Returns a ``QueueListener`` if ``NOTIFY_ENABLED`` is set and the database
+    supports LISTEN/NOTIFY, None otherwise.
+    """
+    if not get_notify_enabled():
+        return None
+
+    using = router.db_for_write(Email)
+    if not supports_notify(db_connections[using]):
+        return None
+    return QueueListener(using)
+
+
+class QueueListener:
+    """
+    Listens for notifications sent by ``notify_email_queued()`` on a dedicated
+    connection, separate from Django's own so that closing Django's connection
+    between batches doesn't stop the listener.
+    """
+
+    def __init__(self, using='default'):
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+        self.is_psycopg3 = is_psycopg3
+        database = db_connections[using]
+        self.connection = database.get_new_connection(database.get_connection_params())
+        self.connection.autocommit = True
+
+        # notifies(timeout=..., stop_after=...) was added in psycopg 3.2, older
+        # versions receive notifications through a handler instead
+        self.notifies_with_timeout = (
+            is_psycopg3 and 'stop_after' in inspect.signature(self.connection.notifies).parameters
+        )
+        self.received = []
+        if is_psycopg3 and not self.notifies_with_timeout:
+            self.connection.add_notify_handler(self.received.append)
+
+        channel = database.ops.quote_name(get_notify_channel())
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'LISTEN {channel}')
+        logger.info('Listening for queued emails on %s', channel)
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Blocks until emails are queued or until ``timeout`` seconds have passed.
+        Returns True if emails were queued.
+        """
+        if self.notifies_with_timeout:
+            return any(True for _ in self.connection.notifies(timeout=timeout, stop_after=1))
+
+        received = self.received if self.is_psycopg3 else self.connection.notifies
+        if not received:
+            readable, _, _ = select.select([self.connection], [], [], timeout)
+            if readable:
+                if self.is_psycopg3:
+                    # Pending notifications are passed to the handler while running any query
+                    self.connection.execute('SELECT 1')
+                else:
+                    self.connection.poll()
+
+        notified = bool(received)
+        received.clear()
+        return notified
+
+    def close(self) -> None:
+        self.connection.close()
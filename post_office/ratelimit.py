@@ -0,0 +1,155 @@
+"""
+Rate limits deliveries per backend, as configured in ``POST_OFFICE['BACKENDS']``
+(and per recipient domain, see ``post_office.domains``):
+
+    POST_OFFICE = {
+        'BACKENDS': {
+            'ses': {
+                'BACKEND': 'django_ses.SESBackend',
+                'RATE_LIMIT': 14,  # Messages per second
+                'RATE_LIMIT_BURST': 14,
+                'RATE_LIMIT_SHARED': True,
+            },
+        },
+    }
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from typing import Optional, Union
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import get_backend_options, get_cache_backend, get_domain_limits
+
+
+class TokenBucket:
+    """
+    Allows ``rate`` messages per second on average and bursts of up to
+    ``burst`` messages, across the threads of this process.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Takes a token if one is available and returns 0. Otherwise returns the
+        number of seconds to wait before trying again.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+
+class SharedTokenBucket:
+    """
+    Like ``TokenBucket``, but counts messages in the cache, so that the rate
+    holds across all processes (and hosts) sharing it. Allows ``burst``
+    messages in every window of ``burst / rate`` seconds.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, cache):
+        self.key_prefix = f'post_office:ratelimit:{name}'
+        self.window = burst / rate
+        self.burst = burst
+        self.cache = cache
+
+    def reserve(self) -> float:
+        now = time.time()
+        window = int(now // self.window)
+        key = f'{self.key_prefix}:{window}'
+        # Keys outlive their window, so they can't expire while being counted
+        self.cache.add(key, 0, timeout=math.ceil(self.window) + 1)
+        try:
+            count = self.cache.incr(key)
+        except ValueError:
+            # Evicted from the cache, don't hold up sending because of it
+            return 0
+        if count <= self.burst:
+            return 0
+        return (window + 1) * self.window - now
+
+
+RateLimiter = Union[TokenBucket, SharedTokenBucket]
+
+_rate_limiters = {}
+_rate_limiters_pid = None
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(alias: str) -> Optional[RateLimiter]:
+    """
+    Returns the rate limiter of backend ``alias``, or None if it isn't rate limited.
+    """
+    return _get_rate_limiter(alias, get_backend_options(alias))
+
+
+def get_domain_rate_limiter(domain: str) -> Optional[RateLimiter]:
+    """
+    Returns the rate limiter of recipient domain ``domain``, or None if it isn't rate limited.
+    """
+    return _get_rate_limiter(f'domain:{domain}', get_domain_limits().get(domain, {}))
+
+
+def _get_rate_limiter(name: str, options: dict) -> Optional[RateLimiter]:
+    global _rate_limiters, _rate_limiters_pid
+    if not options.get('RATE_LIMIT'):
+        return None
+
+    # A new bucket is created when the settings change
+    key = (name, options['RATE_LIMIT'], options.get('RATE_LIMIT_BURST'), options.get('RATE_LIMIT_SHARED'))
+    with _rate_limiters_lock:
+        # Buckets aren't shared with forked processes, every process has its own
+        if _rate_limiters_pid != os.getpid():
+            _rate_limiters = {}
+            _rate_limiters_pid = os.getpid()
+        if key not in _rate_limiters:
+            _rate_limiters[key] = _create_rate_limiter(name, options)
+        return _rate_limiters[key]
+
+
+def _create_rate_limiter(name: str, options: dict) -> RateLimiter:
+    rate = options['RATE_LIMIT']
+    burst = options.get('RATE_LIMIT_BURST', max(1, math.floor(rate)))
+    if not options.get('RATE_LIMIT_SHARED'):
+        return TokenBucket(rate, burst)
+
+    cache = get_cache_backend()
+    if cache is None:
+        raise ImproperlyConfigured(f'RATE_LIMIT_SHARED is set for "{name}", but no cache is configured')
+    return SharedTokenBucket(name, rate, burst, cache)
+
+
+def wait_for_rate_limit(alias: str) -> None:
+    """
+    Blocks until backend ``alias`` may send another message.
+    """
+    rate_limiter = get_rate_limiter(alias)
+    if rate_limiter is None:
+        return
+    while (delay := rate_limiter.reserve()) > 0:
+        time.sleep(delay)
+
+
+async def await_rate_limit(alias: str) -> None:
+    """
+    The asyncio counterpart of ``wait_for_rate_limit()``.
+    """
+    rate_limiter = get_rate_limiter(alias)
+    if rate_limiter is None:
+        return
+    while (delay := rate_limiter.reserve()) > 0:
+        await asyncio.sleep(delay)
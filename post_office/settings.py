@@ -14,7 +14,28 @@ PRE_DJANGO_6 = django.VERSION < (6, 0)
 
 
 def get_backend(alias='default'):
-    return get_available_backends()[alias]
+    backend = get_available_backends()[alias]
+    if isinstance(backend, dict):
+        return backend['BACKEND']
+    return backend
+
+
+def get_backend_options(alias='default'):
+    """Returns the options of a backend defined as a dictionary. For example:
+    {
+        'BACKEND': 'django_ses.SESBackend',
+        'RATE_LIMIT': 14,
+    }
+    """
+    backend = get_available_backends()[alias]
+    if isinstance(backend, dict):
+        return backend
+    return {}
+
+
+def get_chunk_size(alias='default'):
+    """Returns the number of emails handed to one send_messages() call of backend ``alias``."""
+    return max(1, get_backend_options(alias).get('CHUNK_SIZE', 1))
 
 
 def get_available_backends():
@@ -78,10 +99,60 @@ def get_batch_size():
     return get_config().get('BATCH_SIZE', 100)
 
 
+def get_adaptive_batch_size():
+    """Adapt the batch size of send_queued_mail_until_done() between MIN_BATCH_SIZE and MAX_BATCH_SIZE."""
+    return get_config().get('ADAPTIVE_BATCH_SIZE', False)
+
+
+def get_min_batch_size():
+    return get_config().get('MIN_BATCH_SIZE', 10)
+
+
+def get_max_batch_size():
+    return get_config().get('MAX_BATCH_SIZE', 1000)
+
+
+def get_background_dispatch():
+    """Send emails with priority now from background threads, see post_office.dispatcher."""
+    return get_config().get('BACKGROUND_DISPATCH', False)
+
+
+def get_dispatch_threads():
+    return get_config().get('DISPATCH_THREADS', 4)
+
+
+def get_dispatch_queue_size():
+    return get_config().get('DISPATCH_QUEUE_SIZE', 100)
+
+
+def get_deduplicate_attachments():
+    """Reuse attachments with identical content, see post_office.utils.create_attachments()."""
+    return get_config().get('DEDUPLICATE_ATTACHMENTS', False)
+
+
+def get_deduplicate_bodies():
+    """Store identical message and html_message once, see post_office.models.EmailBody."""
+    return get_config().get('DEDUPLICATE_BODIES', False)
+
+
+def get_store_recipients():
+    """Store the recipients of new emails in the Recipient table, indexed by address."""
+    return get_config().get('STORE_RECIPIENTS', False)
+
+
+def get_compression():
+    """Compress message, html_message and (with CompressedJSONField) context with 'zlib' or 'zstd'."""
+    return get_config().get('COMPRESSION')
+
+
 def get_celery_enabled():
     return get_config().get('CELERY_ENABLED', False)
 
 
+def get_row_locking_enabled():
+    return get_config().get('ROW_LOCKING_ENABLED', False)
+
+
 def get_lock_file_name():
     return get_config().get('LOCK_FILE_NAME', 'post_office')
 
@@ -90,6 +161,10 @@ def get_threads_per_process():
     return get_config().get('THREADS_PER_PROCESS', 5)
 
 
+def get_persistent_workers():
+    return get_config().get('PERSISTENT_WORKERS', False)
+
+
 def get_default_priority():
     return get_config().get('DEFAULT_PRIORITY', 'medium')
 
@@ -119,6 +194,56 @@ def get_retry_timedelta():
     return get_config().get('RETRY_INTERVAL', datetime.timedelta(minutes=15))
 
 
+def get_retry_backoff():
+    """Every retry waits RETRY_BACKOFF times longer than the previous one."""
+    return get_config().get('RETRY_BACKOFF', 1)
+
+
+def get_retry_max_interval():
+    return get_config().get('RETRY_MAX_INTERVAL', None)
+
+
+def get_retry_jitter():
+    """Retries are scheduled up to this fraction of their interval earlier, at random."""
+    return get_config().get('RETRY_JITTER', 0)
+
+
+def get_lease_duration():
+    return get_config().get('LEASE_DURATION', datetime.timedelta(minutes=10))
+
+
+def get_domain_limits():
+    return {domain.lower(): limits for domain, limits in get_config().get('DOMAIN_LIMITS', {}).items()}
+
+
+def get_sending_engine():
+    return get_config().get('SENDING_ENGINE', 'threads')
+
+
+def get_async_concurrency():
+    return get_config().get('ASYNC_CONCURRENCY', 100)
+
+
+def get_min_poll_interval():
+    return get_config().get('MIN_POLL_INTERVAL', 0.1)
+
+
+def get_max_poll_interval():
+    return get_config().get('MAX_POLL_INTERVAL', 1)
+
+
+def get_notify_poll_interval():
+    return get_config().get('NOTIFY_POLL_INTERVAL', 30)
+
+
+def get_notify_enabled():
+    return get_config().get('NOTIFY_ENABLED', False)
+
+
+def get_notify_channel():
+    return get_config().get('NOTIFY_CHANNEL', 'post_office_email_queued')
+
+
 def get_message_id_enabled():
     return get_config().get('MESSAGE_ID_ENABLED', False)
 
@@ -132,6 +257,21 @@ def get_batch_delivery_timeout():
     return get_config().get('BATCH_DELIVERY_TIMEOUT', 180)
 
 
+def get_send_timeout():
+    """Sends taking longer than SEND_TIMEOUT seconds are given up on and failed, defaults to BATCH_DELIVERY_TIMEOUT."""
+    return get_config().get('SEND_TIMEOUT', get_batch_delivery_timeout())
+
+
+def get_checkpoint_size():
+    """Statuses are written every CHECKPOINT_SIZE sent (or failed) emails while a batch is sent."""
+    return get_config().get('CHECKPOINT_SIZE', 50)
+
+
+def get_checkpoint_interval():
+    """Statuses are written at least every CHECKPOINT_INTERVAL seconds while a batch is sent."""
+    return get_config().get('CHECKPOINT_INTERVAL', 5)
+
+
 def get_file_storage():
     if storage_name := get_config().get('FILE_STORAGE', None):
         return storages[storage_name]
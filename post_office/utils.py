@@ -1,11 +1,36 @@
+import random
+
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.files import File
+from django.db import transaction
 from django.utils.encoding import force_str
 
 from post_office import cache
-from .models import Email, PRIORITY, STATUS, EmailTemplate, Attachment
-from .settings import get_default_priority
+from .models import (
+    ArchivedEmail,
+    ArchivedLog,
+    Attachment,
+    Email,
+    EmailBody,
+    EmailTemplate,
+    Log,
+    PRIORITY,
+    Recipient,
+    STATUS,
+)
+from .dispatcher import dispatch_now
+from .domains import get_limited_domains
+from .settings import (
+    get_deduplicate_attachments,
+    get_default_priority,
+    get_domain_limits,
+    get_retry_backoff,
+    get_retry_jitter,
+    get_retry_max_interval,
+    get_retry_timedelta,
+    get_store_recipients,
+)
 from .signals import email_queued
 from .validators import validate_email_with_name
 
@@ -41,14 +66,25 @@ def send_mail(
         )
         for address in recipient_list
     ]
+    if get_store_recipients():
+        store_recipients(emails)
     if priority == PRIORITY.now:
         for email in emails:
-            email.dispatch()
+            dispatch_now(email)
     else:
         email_queued.send(sender=Email, emails=emails)
     return emails
 
 
+def store_recipients(emails):
+    """
+    Creates the ``Recipient`` rows of ``emails``, which must already be saved.
+    """
+    Recipient.objects.bulk_create(
+        [recipient for email in emails for recipient in Recipient.for_email(email)], ignore_conflicts=True
+    )
+
+
 def get_email_template(name, language=''):
     """
     Function that returns an email template instance, from cache or DB.
@@ -73,10 +109,41 @@ def split_emails(emails, split_count=1):
     # Group emails into X sublists
     # taken from http://www.garyrobinson.net/2008/04/splitting-a-pyt.html
     # Strange bug, only return 100 email if we do not evaluate the list
-    if list(emails):
+    if not list(emails):
+        return []
+
+    domain_limits = get_domain_limits()
+    if not domain_limits:
         return [emails[i::split_count] for i in range(split_count)]
 
-    return []
+    # Emails to domains with limits are kept in the same sublist, so that
+    # the limits hold across processes. Other emails fill up the sublists.
+    groups = {}
+    for index, email in enumerate(emails):
+        groups.setdefault(get_limited_domains(email, domain_limits), []).append((index, email))
+    unlimited = groups.pop(frozenset(), [])
+
+    sublists = [[] for _ in range(split_count)]
+    for group in sorted(groups.values(), key=len, reverse=True):
+        min(sublists, key=len).extend(group)
+    for item in unlimited:
+        min(sublists, key=len).append(item)
+    # Keep the sending order within each sublist
+    return [[email for _, email in sorted(sublist, key=lambda item: item[0])] for sublist in sublists]
+
+
+def get_retry_delay(number_of_retries):
+    """
+    Returns how long an email waits before its ``number_of_retries``-th retry.
+    The first retry waits ``RETRY_INTERVAL``, every following one ``RETRY_BACKOFF``
+    times longer, up to ``RETRY_MAX_INTERVAL``. ``RETRY_JITTER`` spreads out
+    retries of emails that failed at the same time.
+    """
+    delay = get_retry_timedelta() * get_retry_backoff() ** max(number_of_retries - 1, 0)
+    max_interval = get_retry_max_interval()
+    if max_interval is not None:
+        delay = min(delay, max_interval)
+    return delay * (1 - get_retry_jitter() * random.random())
 
 
 def create_attachments(attachment_files):
@@ -87,6 +154,10 @@ def create_attachments(attachment_files):
         * Key - the filename to be used for the attachment.
         * Value - file-like object, or a filename to open OR a dict of {'file': file-like-object, 'mimetype': string}
 
+    The dict may also contain a 'key' identifying its content, e.g. 'terms-v3': an existing Attachment with
+    that key is reused without reading the file. With DEDUPLICATE_ATTACHMENTS, an existing Attachment with
+    the same content, name, mimetype and headers is reused instead of storing the file again.
+
     Returns a list of Attachment objects
     """
     attachments = []
@@ -95,10 +166,18 @@ def create_attachments(attachment_files):
             content = filedata.get('file', None)
             mimetype = filedata.get('mimetype', None)
             headers = filedata.get('headers', None)
+            key = filedata.get('key', '')
         else:
             content = filedata
             mimetype = None
             headers = None
+            key = ''
+
+        if key:
+            attachment = Attachment.objects.filter(key=key).order_by('id').first()
+            if attachment is not None:
+                attachments.append(attachment)
+                continue
 
         opened_file = None
 
@@ -107,17 +186,30 @@ def create_attachments(attachment_files):
             opened_file = open(content, 'rb')
             content = File(opened_file)
 
-        attachment = Attachment()
-        if mimetype:
-            attachment.mimetype = mimetype
-        attachment.headers = headers
-        attachment.name = filename
-        attachment.file.save(filename, content=content, save=True)
-
-        attachments.append(attachment)
-
-        if opened_file is not None:
-            opened_file.close()
+        try:
+            content_hash = ''
+            if get_deduplicate_attachments():
+                if not hasattr(content, 'chunks'):
+                    content = File(content)
+                content_hash = Attachment.get_content_hash(content, filename, mimetype or '', headers)
+                attachment = Attachment.objects.filter(content_hash=content_hash).order_by('id').first()
+                if attachment is not None:
+                    attachments.append(attachment)
+                    continue
+
+            attachment = Attachment()
+            if mimetype:
+                attachment.mimetype = mimetype
+            attachment.headers = headers
+            attachment.name = filename
+            attachment.content_hash = content_hash
+            attachment.key = key
+            attachment.file.save(filename, content=content, save=True)
+
+            attachments.append(attachment)
+        finally:
+            if opened_file is not None:
+                opened_file.close()
 
     return attachments
 
@@ -173,10 +265,29 @@ def cleanup_expired_mails(cutoff_date, delete_attachments=True, batch_size=1000)
         if deleted_data:
             total_deleted_emails += deleted_data['post_office.Email']
 
+    # Archived emails are deleted along the same cutoff, see archive_emails()
+    while True:
+        email_ids = ArchivedEmail.objects.filter(created__lt=cutoff_date).values_list('id', flat=True)[:batch_size]
+        if not email_ids:
+            break
+
+        _, deleted_data = ArchivedEmail.objects.filter(id__in=email_ids).delete()
+        if deleted_data:
+            total_deleted_emails += deleted_data['post_office.ArchivedEmail']
+
+    # Bodies are only shared by emails, see DEDUPLICATE_BODIES
+    while True:
+        body_ids = list(
+            EmailBody.objects.filter(emails=None, archived_emails=None).values_list('id', flat=True)[:batch_size]
+        )
+        if not body_ids:
+            break
+        EmailBody.objects.filter(id__in=body_ids).delete()
+
     attachments_count = 0
     if delete_attachments:
         while True:
-            attachments = Attachment.objects.filter(emails=None)[:batch_size]
+            attachments = Attachment.objects.filter(emails=None, archived_emails=None)[:batch_size]
             if not attachments:
                 break
             attachment_ids = set()
@@ -188,3 +299,49 @@ def cleanup_expired_mails(cutoff_date, delete_attachments=True, batch_size=1000)
             attachments_count += deleted_count
 
     return total_deleted_emails, attachments_count
+
+
+def archive_emails(cutoff_date, batch_size=1000):
+    """
+    Moves sent and failed emails last updated before the given cutoff date, and
+    their logs, to ``ArchivedEmail`` and ``ArchivedLog``. Their attachments are
+    kept. Returns the number of archived emails.
+    """
+    total_archived = 0
+    while True:
+        with transaction.atomic():
+            emails = list(
+                Email.objects.filter(status__in=[STATUS.sent, STATUS.failed], last_updated__lt=cutoff_date)
+                .order_by('id')
+                .select_for_update()[:batch_size]
+            )
+            if not emails:
+                break
+
+            email_ids = [email.id for email in emails]
+            ArchivedEmail.objects.bulk_create([ArchivedEmail.from_email(email) for email in emails])
+            ArchivedLog.objects.bulk_create(
+                [
+                    ArchivedLog(
+                        id=log.id,
+                        email_id=log.email_id,
+                        date=log.date,
+                        status=log.status,
+                        exception_type=log.exception_type,
+                        message=log.message,
+                    )
+                    for log in Log.objects.filter(email_id__in=email_ids)
+                ]
+            )
+            ArchivedEmail.attachments.through.objects.bulk_create(
+                [
+                    ArchivedEmail.attachments.through(archivedemail_id=email_id, attachment_id=attachment_id)
+                    for email_id, attachment_id in Attachment.emails.through.objects.filter(
+                        email_id__in=email_ids
+                    ).values_list('email_id', 'attachment_id')
+                ]
+            )
+            Email.objects.filter(id__in=email_ids).delete()
+        total_archived += len(emails)
+
+    return total_archived
@@ -1,6 +1,11 @@
 """Webhook handlers package."""
 
-from post_office.webhooks.base import BaseWebhookHandler, ESPEvent
+from post_office.webhooks.base import (
+    BaseWebhookHandler,
+    ESPEvent,
+    get_emails_by_message_id,
+    update_recipient_statuses,
+)
 from post_office.webhooks.ses import SESWebhookHandler
 from post_office.webhooks.sparkpost import SparkPostWebhookHandler
 
@@ -9,4 +14,6 @@ __all__ = [
     'ESPEvent',
     'SESWebhookHandler',
     'SparkPostWebhookHandler',
+    'get_emails_by_message_id',
+    'update_recipient_statuses',
 ]
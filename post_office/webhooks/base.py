@@ -7,12 +7,13 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
 
+from django.db.models import Q
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 
-from post_office.models import RecipientDeliveryStatus
+from post_office.models import Email, Recipient, RecipientDeliveryStatus
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +53,60 @@ class ESPEvent:
     to_addresses: list[str] | None = None
 
 
+def get_emails_by_message_id(message_ids: list[str]) -> dict[str, Email]:
+    """
+    Resolves ``message_ids`` (e.g. of ``ESPEvent``) to emails with a single query.
+    A message ID matches the Message-ID header of an email, with or without angle
+    brackets, or its provider message ID. Returns the emails keyed by the given
+    message IDs, IDs without a matching email are left out.
+    """
+    message_ids = {message_id for message_id in message_ids if message_id}
+    if not message_ids:
+        return {}
+    headers = {message_id.strip('<>') for message_id in message_ids}
+
+    emails_by_id = {}
+    for email in Email.objects.filter(
+        Q(message_id__in=[f'<{header}>' for header in headers] + list(headers))
+        | Q(provider_message_id__in=message_ids)
+    ):
+        if email.message_id:
+            emails_by_id[email.message_id.strip('<>')] = email
+        if email.provider_message_id:
+            emails_by_id[email.provider_message_id] = email
+
+    emails = {}
+    for message_id in message_ids:
+        email = emails_by_id.get(message_id) or emails_by_id.get(message_id.strip('<>'))
+        if email is not None:
+            emails[message_id] = email
+    return emails
+
+
+def update_recipient_statuses(events: list[ESPEvent]) -> int:
+    """
+    Sets the delivery status of the recipients the events apply to, for emails
+    created with ``STORE_RECIPIENTS``. A recipient keeps its status if it's better
+    than the event's, see ``STATUS_PRIORITY``. Events are matched to emails by
+    Message-ID header or provider message ID. Returns the number of updated recipients.
+    """
+    emails = get_emails_by_message_id([event.message_id for event in events if event.recipient])
+    num_updated = 0
+    for event in events:
+        email = emails.get(event.message_id)
+        if email is None or not event.recipient:
+            continue
+        worse_statuses = [
+            status for status, priority in STATUS_PRIORITY.items() if priority > STATUS_PRIORITY[event.delivery_status]
+        ]
+        num_updated += (
+            Recipient.objects.filter(email=email, address=Recipient.normalize_address(event.recipient))
+            .filter(Q(delivery_status=None) | Q(delivery_status__in=worse_statuses))
+            .update(delivery_status=event.delivery_status)
+        )
+    return num_updated
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class BaseWebhookHandler(View):
     """
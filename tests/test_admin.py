@@ -1,8 +1,10 @@
 from django.contrib.admin.sites import AdminSite
 from django.core.files.base import ContentFile
 from django.test import TestCase
+from django.test.utils import override_settings
 
-from post_office.admin import AttachmentInline
+from post_office.admin import AttachmentInline, EmailAdmin
+from post_office.mail import send
 from post_office.models import Email, Attachment
 
 
@@ -51,3 +53,17 @@ class EmailAdminTest(TestCase):
         self.assertIn(attachment_2, non_inline_attachments)
         self.assertNotIn(attachment_3, non_inline_attachments)
         self.assertEqual(len(non_inline_attachments), 2)
+
+    @override_settings(POST_OFFICE={'STORE_RECIPIENTS': True})
+    def test_search_by_recipient_address(self):
+        email = send(['Alice <Alice@example.com>', 'bob@example.com'], 'from@example.com', subject='Hi')
+        send(['carol@example.com'], 'from@example.com', subject='Hi')
+        model_admin = EmailAdmin(Email, self.site)
+        queryset, may_have_duplicates = model_admin.get_search_results(
+            self.request, Email.objects.all(), 'alice@example.com'
+        )
+        self.assertEqual(list(queryset), [email])
+        self.assertFalse(may_have_duplicates)
+        # Other searches scan the to and subject fields as before
+        queryset, _ = model_admin.get_search_results(self.request, Email.objects.all(), 'Hi')
+        self.assertEqual(queryset.count(), 2)
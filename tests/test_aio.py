@@ -0,0 +1,221 @@
+import asyncio
+import importlib.util
+import threading
+import unittest
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.test.utils import override_settings
+
+from post_office.aio import AsyncioPool, _discard_connection, is_async_backend
+from post_office.backends import SendResult
+from post_office.mail import _send_bulk, send_queued
+from post_office.models import STATUS, Email
+
+in_flight = 0
+max_in_flight = 0
+sent_messages = []
+
+
+class AsyncRecordingBackend(mail.backends.base.BaseEmailBackend):
+    """
+    An async EmailBackend that records the number of messages being sent at once
+    """
+
+    async def asend_messages(self, email_messages):
+        global in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        sent_messages.extend(email_messages)
+        return len(email_messages)
+
+
+class AsyncHangingBackend(mail.backends.base.BaseEmailBackend):
+    cancelled = False
+
+    async def asend_messages(self, email_messages):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            AsyncHangingBackend.cancelled = True
+            raise
+
+
+class AsyncBatchBackend(mail.backends.base.BaseEmailBackend):
+    async def asend_messages(self, email_messages):
+        raise AssertionError('asend_batch() should be used instead')
+
+    async def asend_batch(self, email_messages):
+        return [SendResult(provider_message_id=f'provider-{email_message.subject}') for email_message in email_messages]
+
+
+class SMTPSink:
+    """
+    A minimal SMTP server on a local port that collects the messages it receives.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self.handle, '127.0.0.1', 0), self.loop
+        ).result()
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.server.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    async def handle(self, reader, writer):
+        writer.write(b'220 localhost ESMTP\r\n')
+        while line := await reader.readline():
+            command = line[:4].upper()
+            if command == b'EHLO':
+                writer.write(b'250-localhost\r\n250 8BITMIME\r\n')
+            elif command == b'DATA':
+                writer.write(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+                await writer.drain()
+                data = b''
+                while (line := await reader.readline()) != b'.\r\n':
+                    data += line
+                self.messages.append(data)
+                writer.write(b'250 OK\r\n')
+            elif command == b'QUIT':
+                writer.write(b'221 Bye\r\n')
+                await writer.drain()
+                break
+            else:
+                writer.write(b'250 OK\r\n')
+            await writer.drain()
+        writer.close()
+
+
+@override_settings(
+    POST_OFFICE={
+        'BACKENDS': {
+            'default': 'django.core.mail.backends.locmem.EmailBackend',
+            'async': 'tests.test_aio.AsyncRecordingBackend',
+            'hanging': 'tests.test_aio.AsyncHangingBackend',
+            'batch': {'BACKEND': 'tests.test_aio.AsyncBatchBackend', 'CHUNK_SIZE': 2},
+        },
+        'SENDING_ENGINE': 'asyncio',
+        'THREADS_PER_PROCESS': 1,
+        'BATCH_DELIVERY_TIMEOUT': 1,
+    }
+)
+class AsyncioEngineTest(TransactionTestCase):
+    def setUp(self):
+        global in_flight, max_in_flight
+        in_flight, max_in_flight = 0, 0
+        sent_messages.clear()
+
+    def test_is_async_backend(self):
+        self.assertTrue(is_async_backend('async'))
+        self.assertFalse(is_async_backend('default'))
+
+    def test_sends_concurrently(self):
+        """
+        Deliveries aren't limited by THREADS_PER_PROCESS.
+        """
+        Email.objects.bulk_create(
+            [
+                Email(to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued, backend_alias='async')
+                for _ in range(20)
+            ]
+        )
+        self.assertEqual(send_queued(), (20, 0, 0))
+        self.assertEqual(len(sent_messages), 20)
+        self.assertGreater(max_in_flight, 1)
+        self.assertEqual(Email.objects.filter(status=STATUS.sent).count(), 20)
+
+    def test_sync_backends_are_sent_by_threads(self):
+        Email.objects.create(to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued)
+        Email.objects.create(
+            to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued, backend_alias='async'
+        )
+        self.assertEqual(send_queued(), (2, 0, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(len(sent_messages), 1)
+
+    def test_asend_batch(self):
+        Email.objects.bulk_create(
+            [
+                Email(
+                    to=['to@example.com'],
+                    from_email='bob@example.com',
+                    subject=str(i),
+                    status=STATUS.queued,
+                    backend_alias='batch',
+                )
+                for i in range(3)
+            ]
+        )
+        self.assertEqual(send_queued(), (3, 0, 0))
+        self.assertEqual(
+            sorted(Email.objects.values_list('provider_message_id', flat=True)),
+            ['provider-0', 'provider-1', 'provider-2'],
+        )
+
+    def test_engine_argument_overrides_setting(self):
+        Email.objects.create(
+            to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued, backend_alias='async'
+        )
+        with patch('post_office.mail.AsyncioPool', wraps=AsyncioPool) as asyncio_pool:
+            self.assertEqual(send_queued(engine='threads'), (0, 1, 0))
+        asyncio_pool.assert_not_called()
+
+    def test_timeout_cancels_deliveries(self):
+        """
+        Sends that time out are cancelled and failed, the rest of the batch is sent.
+        """
+        hanging_email = Email.objects.create(
+            to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued, backend_alias='hanging'
+        )
+        email = Email.objects.create(
+            to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued, backend_alias='async'
+        )
+        with patch('post_office.aio._discard_connection', wraps=_discard_connection) as discard:
+            self.assertEqual(_send_bulk([hanging_email, email], uses_multiprocessing=False), (1, 1, 0))
+        self.assertTrue(AsyncHangingBackend.cancelled)
+        discard.assert_called_once_with('hanging')
+        hanging_email.refresh_from_db()
+        self.assertEqual(hanging_email.logs.get().exception_type, 'TimeoutError')
+
+    def test_command_engine_option(self):
+        with patch('post_office.management.commands.send_queued_mail.send_queued_mail_until_done') as send:
+            call_command('send_queued_mail', engine='asyncio')
+        self.assertEqual(send.call_args.kwargs['engine'], 'asyncio')
+
+
+@unittest.skipUnless(importlib.util.find_spec('aiosmtplib'), 'Requires aiosmtplib')
+class AsyncSMTPEmailBackendTest(TransactionTestCase):
+    def setUp(self):
+        self.sink = SMTPSink()
+        self.addCleanup(self.sink.close)
+
+    def test_sends_to_smtp_server(self):
+        with override_settings(
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=self.sink.port,
+            POST_OFFICE={
+                'BACKENDS': {'default': 'post_office.backends.AsyncSMTPEmailBackend'},
+                'SENDING_ENGINE': 'asyncio',
+            },
+        ):
+            Email.objects.bulk_create(
+                [
+                    Email(to=['to@example.com'], from_email='bob@example.com', subject='Async', status=STATUS.queued)
+                    for _ in range(10)
+                ]
+            )
+            self.assertEqual(send_queued(), (10, 0, 0))
+        self.assertEqual(len(self.sink.messages), 10)
+        self.assertIn(b'Subject: Async', self.sink.messages[0])
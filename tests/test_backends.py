@@ -10,7 +10,7 @@ from django.test import TestCase
 from django.test.utils import override_settings
 
 from post_office.models import PRIORITY, STATUS, Email
-from post_office.settings import get_backend
+from post_office.settings import get_backend, get_backend_options
 
 
 class ErrorRaisingBackend(BaseEmailBackend):
@@ -64,6 +64,20 @@ class BackendTest(TestCase):
             delattr(settings, 'EMAIL_BACKEND')
         setattr(settings, 'POST_OFFICE', previous_settings)
 
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {
+                'default': 'django.core.mail.backends.smtp.EmailBackend',
+                'limited': {'BACKEND': 'django.core.mail.backends.locmem.EmailBackend', 'RATE_LIMIT': 5},
+            }
+        }
+    )
+    def test_get_backend_with_options(self):
+        self.assertEqual(get_backend(), 'django.core.mail.backends.smtp.EmailBackend')
+        self.assertEqual(get_backend_options(), {})
+        self.assertEqual(get_backend('limited'), 'django.core.mail.backends.locmem.EmailBackend')
+        self.assertEqual(get_backend_options('limited')['RATE_LIMIT'], 5)
+
     @override_settings(EMAIL_BACKEND='post_office.EmailBackend')
     def test_sending_html_email(self):
         """
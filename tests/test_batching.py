@@ -0,0 +1,83 @@
+from unittest.mock import patch
+
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import override_settings
+
+from post_office.batching import AdaptiveBatchSize, get_batch_sizer
+from post_office.mail import send_queued, send_queued_mail_until_done
+from post_office.models import STATUS, Email
+
+
+class AdaptiveBatchSizeTest(TestCase):
+    def test_grows_while_latency_holds(self):
+        batch_sizer = AdaptiveBatchSize(initial=10, minimum=5, maximum=40, time_budget=60)
+        sizes = []
+        for _ in range(5):
+            batch_sizer.record(attempted=batch_sizer.size, failed=0, elapsed=batch_sizer.size * 0.01)
+            sizes.append(batch_sizer.size)
+        self.assertEqual(sizes, [15, 22, 33, 40, 40])
+
+    def test_shrinks_when_latency_rises(self):
+        batch_sizer = AdaptiveBatchSize(initial=100, minimum=5, maximum=1000, time_budget=60)
+        batch_sizer.record(attempted=100, failed=0, elapsed=1)
+        self.assertEqual(batch_sizer.size, 150)
+        batch_sizer.record(attempted=150, failed=0, elapsed=3)
+        self.assertEqual(batch_sizer.size, 75)
+
+    def test_shrinks_on_failures(self):
+        batch_sizer = AdaptiveBatchSize(initial=100, minimum=30, maximum=1000, time_budget=60)
+        batch_sizer.record(attempted=100, failed=50, elapsed=1)
+        self.assertEqual(batch_sizer.size, 50)
+        batch_sizer.record(attempted=50, failed=50, elapsed=1)
+        self.assertEqual(batch_sizer.size, 30)
+
+    def test_stays_within_time_budget(self):
+        batch_sizer = AdaptiveBatchSize(initial=100, minimum=5, maximum=1000, time_budget=10)
+        # 0.5 seconds per email, only 20 emails fit in the time budget
+        batch_sizer.record(attempted=100, failed=0, elapsed=50)
+        self.assertEqual(batch_sizer.size, 20)
+
+    def test_ignores_partial_batches(self):
+        batch_sizer = AdaptiveBatchSize(initial=100, minimum=5, maximum=1000, time_budget=60)
+        batch_sizer.record(attempted=3, failed=0, elapsed=1)
+        batch_sizer.record(attempted=0, failed=0, elapsed=1)
+        self.assertEqual(batch_sizer.size, 100)
+        self.assertIsNone(batch_sizer.latency)
+
+    def test_initial_size_is_clamped(self):
+        self.assertEqual(AdaptiveBatchSize(initial=100, minimum=5, maximum=50, time_budget=60).size, 50)
+        self.assertEqual(AdaptiveBatchSize(initial=1, minimum=5, maximum=50, time_budget=60).size, 5)
+
+    @override_settings(POST_OFFICE={'BATCH_SIZE': 20})
+    def test_disabled_by_default(self):
+        self.assertIsNone(get_batch_sizer())
+
+    @override_settings(
+        POST_OFFICE={'ADAPTIVE_BATCH_SIZE': True, 'BATCH_SIZE': 20, 'MIN_BATCH_SIZE': 2, 'MAX_BATCH_SIZE': 200}
+    )
+    def test_get_batch_sizer(self):
+        batch_sizer = get_batch_sizer()
+        self.assertEqual((batch_sizer.size, batch_sizer.minimum, batch_sizer.maximum), (20, 2, 200))
+
+
+@override_settings(
+    POST_OFFICE={
+        'BACKENDS': {'default': 'django.core.mail.backends.locmem.EmailBackend'},
+        'ADAPTIVE_BATCH_SIZE': True,
+        'BATCH_SIZE': 2,
+        'MIN_BATCH_SIZE': 2,
+        'MAX_BATCH_SIZE': 4,
+    }
+)
+class AdaptiveSendingTest(TransactionTestCase):
+    def test_send_queued_mail_until_done(self):
+        Email.objects.bulk_create(
+            [Email(to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued) for _ in range(9)]
+        )
+        with patch('post_office.mail.send_queued', wraps=send_queued) as send:
+            send_queued_mail_until_done(lockfile='/tmp/post_office_test_lockfile')
+        self.assertEqual(Email.objects.filter(status=STATUS.sent).count(), 9)
+        batch_sizes = [call.args[5] for call in send.call_args_list]
+        # Nothing is known about the latency before the first batch
+        self.assertEqual(batch_sizes[:2], [2, 3])
+        self.assertLessEqual(max(batch_sizes), 4)
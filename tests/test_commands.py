@@ -1,5 +1,6 @@
 import datetime
 import os
+from unittest.mock import patch
 
 from django.core.files.base import ContentFile
 from django.core.management import call_command
@@ -7,7 +8,8 @@ from django.test import TestCase
 from django.test.utils import override_settings
 from django.utils.timezone import now
 
-from post_office.models import STATUS, Attachment, Email
+from post_office.lockfile import default_lockfile
+from post_office.models import PRIORITY, STATUS, ArchivedEmail, Attachment, Email, EmailBody, Log
 
 
 class CommandTest(TestCase):
@@ -73,6 +75,62 @@ class CommandTest(TestCase):
         call_command('cleanup_mail', days=30)
         self.assertEqual(Email.objects.count(), 0)
 
+    def test_archive_mail(self):
+        """
+        ``archive_mail`` moves old sent and failed emails, with their logs, to the archive tables.
+        """
+        old = now() - datetime.timedelta(31)
+        body = EmailBody.objects.create(content_hash='a', message='Shared')
+        sent_email = Email.objects.create(
+            from_email='from@example.com', to=['to@example.com'], status=STATUS.sent, subject='Sent', body=body
+        )
+        sent_email.logs.create(status=STATUS.sent, message='')
+        attachment = Attachment.objects.create(name='test.txt')
+        attachment.emails.add(sent_email)
+        failed_email = Email.objects.create(from_email='from@example.com', to=['to@example.com'], status=STATUS.failed)
+        queued_email = Email.objects.create(from_email='from@example.com', to=['to@example.com'], status=STATUS.queued)
+        recent_email = Email.objects.create(from_email='from@example.com', to=['to@example.com'], status=STATUS.sent)
+        Email.objects.exclude(id=recent_email.id).update(last_updated=old)
+
+        call_command('archive_mail', days=30, batch_size=1)
+        self.assertEqual(set(Email.objects.all()), {queued_email, recent_email})
+        self.assertEqual(set(ArchivedEmail.objects.values_list('id', flat=True)), {sent_email.id, failed_email.id})
+        self.assertFalse(Log.objects.exists())
+
+        archived_email = ArchivedEmail.objects.get(id=sent_email.id)
+        self.assertEqual(archived_email.subject, 'Sent')
+        self.assertEqual(archived_email.to, ['to@example.com'])
+        self.assertEqual(archived_email.created, sent_email.created)
+        self.assertEqual(archived_email.body, body)
+        self.assertEqual(archived_email.logs.get().status, STATUS.sent)
+        self.assertEqual(list(archived_email.attachments.all()), [attachment])
+
+        # Attachments and bodies of archived emails aren't orphaned
+        call_command('cleanup_mail', '-da', days=30)
+        self.assertTrue(Attachment.objects.exists())
+        self.assertTrue(EmailBody.objects.exists())
+
+        # Archived emails are cleaned up like any other
+        ArchivedEmail.objects.update(created=now() - datetime.timedelta(91))
+        call_command('cleanup_mail', '-da', days=90)
+        self.assertFalse(ArchivedEmail.objects.exists())
+        self.assertFalse(Attachment.objects.exists())
+        self.assertFalse(EmailBody.objects.exists())
+
+    def test_cleanup_mail_deletes_orphaned_bodies(self):
+        body = EmailBody.objects.create(content_hash='a', message='Shared')
+        old_email = Email.objects.create(from_email='from@example.com', to=['to@example.com'], body=body)
+        Email.objects.filter(id=old_email.id).update(created=now() - datetime.timedelta(31))
+        EmailBody.objects.create(content_hash='b', message='Orphaned')
+
+        email = Email.objects.create(from_email='from@example.com', to=['to@example.com'], body=body)
+        call_command('cleanup_mail', days=30)
+        self.assertEqual(list(EmailBody.objects.all()), [body])
+
+        email.delete()
+        call_command('cleanup_mail', days=30)
+        self.assertFalse(EmailBody.objects.exists())
+
     @override_settings(
         POST_OFFICE={
             'BACKENDS': {
@@ -95,6 +153,48 @@ class CommandTest(TestCase):
         self.assertEqual(Email.objects.filter(status=STATUS.sent).count(), 2)
         self.assertEqual(Email.objects.filter(status=STATUS.queued).count(), 0)
 
+    def test_send_queued_mail_daemon(self):
+        """
+        ``send_queued_mail --daemon`` keeps running instead of exiting once the queue is empty.
+        """
+        with patch('post_office.management.commands.send_queued_mail.send_queued_mail_forever') as forever:
+            with patch('post_office.management.commands.send_queued_mail.send_queued_mail_until_done') as until_done:
+                call_command('send_queued_mail', daemon=True, processes=2)
+        forever.assert_called_once()
+        self.assertEqual(forever.call_args.args[1], 2)
+        until_done.assert_not_called()
+
+    def test_send_queued_mail_priority(self):
+        """
+        ``send_queued_mail --priority`` only sends emails with the given priorities.
+        """
+        for priority in PRIORITY:
+            Email.objects.create(
+                from_email='from@example.com', to=['to@example.com'], status=STATUS.queued, priority=priority
+            )
+        call_command('send_queued_mail', priority=['high', 'now'])
+        self.assertEqual(
+            sorted(Email.objects.filter(status=STATUS.sent).values_list('priority', flat=True)),
+            [PRIORITY.high, PRIORITY.now],
+        )
+        self.assertEqual(Email.objects.filter(status=STATUS.queued).count(), 2)
+
+    def test_send_queued_mail_priority_lockfile(self):
+        """
+        Every priority lane has its own lock file, unless one is given.
+        """
+        with patch('post_office.management.commands.send_queued_mail.send_queued_mail_until_done') as until_done:
+            call_command('send_queued_mail', priority=['now', 'high'])
+            self.assertEqual(until_done.call_args.args[0], f'{default_lockfile}-high-now')
+            self.assertEqual(until_done.call_args.kwargs['priorities'], [PRIORITY.high, PRIORITY.now])
+
+            call_command('send_queued_mail', priority=['low'], lockfile='/tmp/bulk')
+            self.assertEqual(until_done.call_args.args[0], '/tmp/bulk')
+
+            call_command('send_queued_mail')
+            self.assertEqual(until_done.call_args.args[0], default_lockfile)
+            self.assertIsNone(until_done.call_args.kwargs['priorities'])
+
     def test_successful_deliveries_logging(self):
         """
         Successful deliveries are only logged when log_level is 2.
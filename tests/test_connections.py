@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 from django.core.mail import backends
 from django.test import TestCase
 
@@ -20,3 +22,13 @@ class ConnectionTest(TestCase):
         connections.close()
         second = connections['locmem']
         self.assertIsNot(first, second)
+
+    def test_discard(self):
+        first = connections['locmem']
+        with patch.object(first, 'close') as close:
+            connections.discard('locmem')
+        close.assert_called_once_with()
+        self.assertIsNot(connections['locmem'], first)
+        # Discarding a connection that isn't open is a no-op
+        connections.discard('error')
+        connections.discard('error')
@@ -0,0 +1,81 @@
+import threading
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.db import transaction
+from django.test import TransactionTestCase
+from django.test.utils import override_settings
+
+from post_office import mail as post_office_mail
+from post_office.dispatcher import Dispatcher, close_dispatcher, get_dispatcher
+from post_office.models import STATUS, Email
+
+release_sends = threading.Event()
+
+
+class BlockingBackend(LocmemBackend):
+    def send_messages(self, email_messages):
+        release_sends.wait(5)
+        return super().send_messages(email_messages)
+
+
+@override_settings(
+    POST_OFFICE={
+        'BACKENDS': {
+            'default': 'django.core.mail.backends.locmem.EmailBackend',
+            'blocking': 'tests.test_dispatcher.BlockingBackend',
+        },
+        'BACKGROUND_DISPATCH': True,
+        'DISPATCH_THREADS': 1,
+        'DISPATCH_QUEUE_SIZE': 0,
+    }
+)
+class DispatcherTest(TransactionTestCase):
+    def setUp(self):
+        release_sends.clear()
+        self.addCleanup(close_dispatcher)
+        self.addCleanup(release_sends.set)
+
+    def test_sends_in_background(self):
+        email = post_office_mail.send(
+            'to@example.com', 'from@example.com', subject='Now', priority='now', backend='blocking'
+        )
+        # Leased until it's sent, so that it's requeued if this process dies
+        email.refresh_from_db()
+        self.assertEqual(email.status, STATUS.sending)
+        self.assertTrue(email.lease_owner)
+        release_sends.set()
+        close_dispatcher()
+        email.refresh_from_db()
+        self.assertEqual(email.status, STATUS.sent)
+        self.assertEqual((email.lease_owner, email.lease_expires_at), ('', None))
+        self.assertEqual(mail.outbox[0].subject, 'Now')
+
+    def test_queues_when_saturated(self):
+        blocked_email = post_office_mail.send(
+            'to@example.com', 'from@example.com', priority='now', backend='blocking'
+        )
+        with patch('post_office.dispatcher.email_queued.send') as email_queued:
+            email = post_office_mail.send('to@example.com', 'from@example.com', priority='now')
+        email.refresh_from_db()
+        self.assertEqual(email.status, STATUS.queued)
+        self.assertEqual(email.lease_owner, '')
+        email_queued.assert_called_once_with(sender=Email, emails=[email])
+
+        release_sends.set()
+        close_dispatcher()
+        blocked_email.refresh_from_db()
+        self.assertEqual(blocked_email.status, STATUS.sent)
+
+    def test_waits_for_commit(self):
+        with patch.object(Dispatcher, 'submit', return_value=True) as submit:
+            with transaction.atomic():
+                post_office_mail.send('to@example.com', 'from@example.com', priority='now')
+                submit.assert_not_called()
+            submit.assert_called_once()
+
+    def test_dispatcher_is_reused(self):
+        self.assertIs(get_dispatcher(), get_dispatcher())
+        with override_settings(POST_OFFICE={'BACKGROUND_DISPATCH': False}):
+            self.assertIsNone(get_dispatcher())
@@ -0,0 +1,113 @@
+import threading
+import time
+from multiprocessing.context import TimeoutError
+
+from django.core import mail
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import override_settings
+
+from post_office.domains import DomainScheduler, get_limited_domains
+from post_office.mail import _send_bulk
+from post_office.models import STATUS, Email
+from post_office.utils import split_emails
+
+lock = threading.Lock()
+in_flight = {}
+max_in_flight = {}
+
+
+class ConcurrencyRecordingBackend(mail.backends.base.BaseEmailBackend):
+    """
+    An EmailBackend that records the number of messages being sent at once per recipient domain
+    """
+
+    def send_messages(self, email_messages):
+        domain = email_messages[0].to[0].rpartition('@')[2]
+        with lock:
+            in_flight[domain] = in_flight.get(domain, 0) + 1
+            max_in_flight[domain] = max(max_in_flight.get(domain, 0), in_flight[domain])
+        time.sleep(0.02)
+        with lock:
+            in_flight[domain] -= 1
+        return len(email_messages)
+
+
+def create_email(*recipients):
+    return Email(to=list(recipients), from_email='bob@example.com', status=STATUS.queued)
+
+
+class DomainSchedulerTest(TestCase):
+    def test_get_limited_domains(self):
+        email = create_email('Alice <alice@GMAIL.com>', 'bob@example.com')
+        email.cc = ['carol@outlook.com']
+        limits = {'gmail.com': {}, 'outlook.com': {}, 'yahoo.com': {}}
+        self.assertEqual(get_limited_domains(email, limits), frozenset({'gmail.com', 'outlook.com'}))
+
+    def test_holds_back_domains_at_their_concurrency_limit(self):
+        emails = [create_email('a@gmail.com'), create_email('b@gmail.com'), create_email('c@example.com')]
+        scheduler = DomainScheduler({'gmail.com': {'MAX_CONCURRENCY': 1}})
+        scheduled = scheduler.schedule(emails, timeout=1)
+        self.assertIs(next(scheduled), emails[0])
+        # The second gmail.com email waits, the example.com one is sent first
+        self.assertIs(next(scheduled), emails[2])
+        scheduler.release(emails[0])
+        self.assertIs(next(scheduled), emails[1])
+        self.assertIsNone(next(scheduled, None))
+
+    def test_times_out(self):
+        emails = [create_email('a@gmail.com'), create_email('b@gmail.com')]
+        scheduler = DomainScheduler({'gmail.com': {'MAX_CONCURRENCY': 1}})
+        scheduled = scheduler.schedule(emails, timeout=0.1)
+        next(scheduled)
+        with self.assertRaises(TimeoutError):
+            next(scheduled)
+
+    @override_settings(POST_OFFICE={'DOMAIN_LIMITS': {'gmail.com': {'RATE_LIMIT': 10, 'RATE_LIMIT_BURST': 1}}})
+    def test_holds_back_domains_out_of_rate(self):
+        emails = [create_email('a@gmail.com'), create_email('b@gmail.com'), create_email('c@example.com')]
+        scheduler = DomainScheduler({'gmail.com': {'RATE_LIMIT': 10, 'RATE_LIMIT_BURST': 1}})
+        start = time.monotonic()
+        self.assertEqual(list(scheduler.schedule(emails, timeout=1)), [emails[0], emails[2], emails[1]])
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    @override_settings(POST_OFFICE={'DOMAIN_LIMITS': {'gmail.com': {'MAX_CONCURRENCY': 1}}})
+    def test_split_emails_keeps_limited_domains_together(self):
+        emails = [create_email(f'{i}@gmail.com' if i % 2 else f'{i}@example.com') for i in range(8)]
+        email_lists = split_emails(emails, 2)
+        self.assertEqual([len(email_list) for email_list in email_lists], [4, 4])
+        self.assertTrue(all('gmail.com' in email.to[0] for email in email_lists[0]))
+        # Sending order is kept
+        self.assertEqual(email_lists[1], [emails[0], emails[2], emails[4], emails[6]])
+
+
+class DomainLimitsTest(TransactionTestCase):
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {'default': 'tests.test_domains.ConcurrencyRecordingBackend'},
+            'DOMAIN_LIMITS': {'gmail.com': {'MAX_CONCURRENCY': 1}},
+            'THREADS_PER_PROCESS': 4,
+        }
+    )
+    def test_send_bulk_respects_domain_concurrency(self):
+        emails = Email.objects.bulk_create(
+            [create_email('a@gmail.com') for _ in range(6)] + [create_email('b@example.com') for _ in range(6)]
+        )
+        self.assertEqual(_send_bulk(emails, uses_multiprocessing=False), (12, 0, 0))
+        self.assertEqual(max_in_flight['gmail.com'], 1)
+        self.assertGreater(max_in_flight['example.com'], 1)
+
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {'default': {'BACKEND': 'tests.test_domains.ConcurrencyRecordingBackend', 'CHUNK_SIZE': 3}},
+            'DOMAIN_LIMITS': {'gmail.com': {'MAX_CONCURRENCY': 1}},
+            'THREADS_PER_PROCESS': 1,
+            'BATCH_DELIVERY_TIMEOUT': 1,
+        }
+    )
+    def test_send_bulk_flushes_chunks_held_back_by_domain_limits(self):
+        """
+        An email waiting for its chunk to fill up doesn't block the next email to its domain.
+        """
+        emails = Email.objects.bulk_create([create_email('a@gmail.com') for _ in range(3)])
+        self.assertEqual(_send_bulk(emails, uses_multiprocessing=False), (3, 0, 0))
+        self.assertEqual(max_in_flight['gmail.com'], 1)
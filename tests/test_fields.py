@@ -0,0 +1,58 @@
+import unittest
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from post_office.fields import CompressedJSONField, compress, decompress, zstd
+from post_office.models import Email
+
+HTML = '<p>' + 'Hello newsletter subscriber! ' * 100 + '</p>'
+
+
+class CompressionTest(TestCase):
+    def test_compress(self):
+        compressed = compress(HTML, 'zlib')
+        self.assertTrue(compressed.startswith('\x1fzlib:'))
+        self.assertLess(len(compressed), len(HTML) / 5)
+        self.assertEqual(decompress(compressed), HTML)
+
+    def test_short_values_are_kept(self):
+        self.assertEqual(compress('Hello', 'zlib'), 'Hello')
+        self.assertEqual(decompress('Hello'), 'Hello')
+
+    def test_unknown_algorithm(self):
+        with self.assertRaises(ImproperlyConfigured):
+            compress(HTML, 'lzma')
+
+    @unittest.skipIf(zstd is None, 'Requires Python 3.14 or zstandard')
+    def test_zstd(self):
+        compressed = compress(HTML, 'zstd')
+        self.assertTrue(compressed.startswith('\x1fzstd:'))
+        self.assertEqual(decompress(compressed), HTML)
+
+    def test_compressed_text_field(self):
+        with override_settings(POST_OFFICE={'COMPRESSION': 'zlib'}):
+            email = Email.objects.create(to=['to@example.com'], from_email='from@example.com', html_message=HTML)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT html_message FROM post_office_email WHERE id = %s', [email.id])
+            self.assertTrue(cursor.fetchone()[0].startswith('\x1fzlib:'))
+
+        # Compressed and uncompressed rows read the same, whether compression is enabled or not
+        uncompressed_email = Email.objects.create(
+            to=['to@example.com'], from_email='from@example.com', html_message=HTML
+        )
+        for email in Email.objects.all():
+            self.assertEqual(email.html_message, HTML)
+        with override_settings(POST_OFFICE={'COMPRESSION': 'zlib'}):
+            self.assertEqual(Email.objects.get(id=uncompressed_email.id).html_message, HTML)
+
+    def test_compressed_json_field(self):
+        field = CompressedJSONField()
+        context = {'items': ['item'] * 100}
+        with override_settings(POST_OFFICE={'COMPRESSION': 'zlib'}):
+            prepared = field.get_db_prep_value(context, connection)
+        self.assertEqual(field.from_db_value(prepared, None, connection), context)
+        # Values saved before compression was enabled
+        self.assertEqual(field.from_db_value(field.get_db_prep_value(context, connection), None, connection), context)
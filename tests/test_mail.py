@@ -1,29 +1,44 @@
+import multiprocessing
+import os
 import re
+import signal
+import threading
 import time
 from datetime import timedelta
+from smtplib import SMTPException
 from multiprocessing.context import TimeoutError
-from unittest.mock import patch
+from unittest.mock import call, patch
 from zoneinfo import ZoneInfo
 
 from django.conf import settings
 from django.core import mail
-from django.core.exceptions import ValidationError
+from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.core.files.base import ContentFile
-from django.test import TransactionTestCase
+from django.db import connection as db_connection
+from django.test import TransactionTestCase, skipUnlessDBFeature
 from django.test.utils import override_settings
 from django.utils import timezone
 
+from post_office.backends import SendResult
+from post_office.connections import connections
 from post_office.mail import (
+    _apply_in_pool_until_timeout,
+    _lock_rows,
     _send_bulk,
+    _update_statuses,
     attach_templates,
+    claim_queued,
     create,
     get_queued,
+    requeue_expired_leases,
     send,
     send_many,
     send_queued,
+    send_queued_mail_forever,
     send_queued_mail_until_done,
+    supports_row_locking,
 )
-from post_office.models import PRIORITY, STATUS, Attachment, Email, EmailTemplate
+from post_office.models import PRIORITY, STATUS, Attachment, Email, EmailBody, EmailTemplate, Log
 from post_office.settings import (
     get_batch_size,
     get_log_level,
@@ -33,17 +48,22 @@ from post_office.settings import (
 )
 
 connection_counter = 0
+closed_connection_counter = 0
 
 
 class ConnectionTestingBackend(mail.backends.base.BaseEmailBackend):
     """
-    An EmailBackend that increments a global counter when connection is opened
+    An EmailBackend that increments a global counter when connection is opened or closed
     """
 
     def open(self):
         global connection_counter
         connection_counter += 1
 
+    def close(self):
+        global closed_connection_counter
+        closed_connection_counter += 1
+
     def send_messages(self, email_messages):
         pass
 
@@ -57,6 +77,64 @@ class SlowTestBackend(mail.backends.base.BaseEmailBackend):
         time.sleep(5)
 
 
+pipeline_events = []
+
+
+class PipelineRecordingBackend(mail.backends.base.BaseEmailBackend):
+    """
+    An EmailBackend that records when messages are sent
+    """
+
+    def send_messages(self, email_messages):
+        for email_message in email_messages:
+            pipeline_events.append(('send', email_message.subject))
+        return len(email_messages)
+
+
+chunk_sizes = []
+
+
+class ChunkRecordingBackend(mail.backends.base.BaseEmailBackend):
+    """
+    An EmailBackend that records how many messages are sent per call
+    """
+
+    def send_messages(self, email_messages):
+        chunk_sizes.append(len(email_messages))
+        if any(email_message.subject == 'fail' for email_message in email_messages):
+            raise SMTPException('Chunk rejected')
+        return len(email_messages)
+
+
+class BatchRecordingBackend(mail.backends.base.BaseEmailBackend):
+    """
+    An EmailBackend implementing send_batch(), which rejects messages with the subject "fail"
+    """
+
+    def send_messages(self, email_messages):
+        raise AssertionError('send_batch() should be used instead')
+
+    def send_batch(self, email_messages):
+        chunk_sizes.append(len(email_messages))
+        return [
+            SendResult(exception=SMTPException('Rejected'))
+            if email_message.subject == 'fail'
+            else SendResult(provider_message_id=f'provider-{email_message.subject}')
+            for email_message in email_messages
+        ]
+
+
+class SlowSubjectBackend(mail.backends.base.BaseEmailBackend):
+    """
+    An EmailBackend that sleeps for 3 seconds when sending messages with the subject "slow"
+    """
+
+    def send_messages(self, email_messages):
+        if any(email_message.subject == 'slow' for email_message in email_messages):
+            time.sleep(3)
+        return len(email_messages)
+
+
 class MailTest(TransactionTestCase):
     @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
     def test_send_queued_mail(self):
@@ -173,6 +251,246 @@ class MailTest(TransactionTestCase):
         _send_bulk([email_1, email_2, email_3])
         self.assertEqual(connection_counter, 2)
 
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {'default': 'tests.test_mail.PipelineRecordingBackend'},
+            'THREADS_PER_PROCESS': 1,
+        }
+    )
+    def test_send_bulk_pipelines_prepare_and_send(self):
+        """
+        Emails are prepared while earlier ones are being sent, and only a bounded
+        number of prepared messages are held in memory at once.
+        """
+        pipeline_events.clear()
+        emails = Email.objects.bulk_create(
+            [
+                Email(to=['to@example.com'], from_email='bob@example.com', subject=str(i), status=STATUS.queued)
+                for i in range(6)
+            ]
+        )
+        prepare_email_message = Email.prepare_email_message
+
+        def prepare(email):
+            pipeline_events.append(('prepare', email.subject))
+            return prepare_email_message(email)
+
+        with patch.object(Email, 'prepare_email_message', autospec=True, side_effect=prepare):
+            self.assertEqual(_send_bulk(emails, uses_multiprocessing=False), (6, 0, 0))
+
+        # The first email is sent before the last one is prepared
+        self.assertLess(pipeline_events.index(('send', '0')), pipeline_events.index(('prepare', '5')))
+        # With one thread, at most two prepared emails are waiting to be sent at any time
+        in_flight = 0
+        for event, _ in pipeline_events:
+            in_flight += 1 if event == 'prepare' else -1
+            self.assertLessEqual(in_flight, 2)
+        # Prepared messages are released once sent
+        self.assertTrue(all(email._cached_email_message is None for email in emails))
+
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {
+                'default': {'BACKEND': 'tests.test_mail.ChunkRecordingBackend', 'CHUNK_SIZE': 3},
+                'locmem': 'django.core.mail.backends.locmem.EmailBackend',
+            },
+            'THREADS_PER_PROCESS': 1,
+        }
+    )
+    def test_send_bulk_sends_chunks(self):
+        """
+        Emails are handed to send_messages() in chunks of the backend's CHUNK_SIZE.
+        """
+        chunk_sizes.clear()
+        emails = Email.objects.bulk_create(
+            [Email(to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued) for _ in range(7)]
+            + [Email(to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued, backend_alias='locmem')]
+        )
+        self.assertEqual(_send_bulk(emails, uses_multiprocessing=False), (8, 0, 0))
+        self.assertEqual(chunk_sizes, [3, 3, 1])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(Email.objects.filter(status=STATUS.sent).count(), 8)
+
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {'default': {'BACKEND': 'tests.test_mail.ChunkRecordingBackend', 'CHUNK_SIZE': 2}},
+            'THREADS_PER_PROCESS': 1,
+            'MAX_RETRIES': 0,
+        }
+    )
+    def test_send_bulk_failed_chunk(self):
+        """
+        When send_messages() fails, all emails of its chunk are failed.
+        """
+        chunk_sizes.clear()
+        emails = Email.objects.bulk_create(
+            [
+                Email(to=['to@example.com'], from_email='bob@example.com', subject=subject, status=STATUS.queued)
+                for subject in ['ok', 'ok', 'ok', 'fail']
+            ]
+        )
+        self.assertEqual(_send_bulk(emails, uses_multiprocessing=False), (2, 2, 0))
+        self.assertEqual(chunk_sizes, [2, 2])
+        self.assertEqual(
+            sorted(Email.objects.values_list('subject', 'status')),
+            [('fail', STATUS.failed), ('ok', STATUS.sent), ('ok', STATUS.sent), ('ok', STATUS.failed)],
+        )
+        self.assertEqual(Log.objects.filter(exception_type='SMTPException').count(), 2)
+
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {'default': {'BACKEND': 'tests.test_mail.BatchRecordingBackend', 'CHUNK_SIZE': 3}},
+            'THREADS_PER_PROCESS': 1,
+            'MAX_RETRIES': 0,
+        }
+    )
+    def test_send_bulk_uses_send_batch(self):
+        """
+        Backends implementing send_batch() report the outcome of every email of a chunk.
+        """
+        chunk_sizes.clear()
+        emails = Email.objects.bulk_create(
+            [
+                Email(to=['to@example.com'], from_email='bob@example.com', subject=subject, status=STATUS.queued)
+                for subject in ['1', 'fail', '2', '3']
+            ]
+        )
+        self.assertEqual(_send_bulk(emails, uses_multiprocessing=False, log_level=2), (3, 1, 0))
+        # The last email is sent with send_batch() on its own
+        self.assertEqual(chunk_sizes, [3, 1])
+        self.assertEqual(
+            sorted(Email.objects.values_list('subject', 'status', 'provider_message_id')),
+            [
+                ('1', STATUS.sent, 'provider-1'),
+                ('2', STATUS.sent, 'provider-2'),
+                ('3', STATUS.sent, 'provider-3'),
+                ('fail', STATUS.failed, ''),
+            ],
+        )
+        self.assertEqual(
+            sorted(Log.objects.values_list('email__subject', 'status', 'exception_type')),
+            [
+                ('1', STATUS.sent, ''),
+                ('2', STATUS.sent, ''),
+                ('3', STATUS.sent, ''),
+                ('fail', STATUS.failed, 'SMTPException'),
+            ],
+        )
+
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {'default': 'django.core.mail.backends.locmem.EmailBackend'},
+            'THREADS_PER_PROCESS': 1,
+            'CHECKPOINT_SIZE': 2,
+        }
+    )
+    def test_send_bulk_checkpoints_statuses(self):
+        """
+        Statuses are written every CHECKPOINT_SIZE emails while the batch is sent.
+        """
+        emails = Email.objects.bulk_create(
+            [Email(to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued) for _ in range(5)]
+        )
+        checkpoints = []
+
+        def update_statuses(held_leases, sent_emails, failed_emails, log_level):
+            checkpoints.append(len(sent_emails))
+            return _update_statuses(held_leases, sent_emails, failed_emails, log_level)
+
+        with patch('post_office.mail._update_statuses', side_effect=update_statuses):
+            self.assertEqual(_send_bulk(emails, uses_multiprocessing=False), (5, 0, 0))
+        self.assertEqual(checkpoints, [2, 2, 1])
+        self.assertEqual(Email.objects.filter(status=STATUS.sent).count(), 5)
+
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {'default': 'tests.test_mail.SlowSubjectBackend'},
+            'THREADS_PER_PROCESS': 1,
+            'BATCH_DELIVERY_TIMEOUT': 1,
+            'MAX_RETRIES': 1,
+        }
+    )
+    def test_send_bulk_timeout_keeps_sent_statuses(self):
+        """
+        When all sending threads are stuck, the batch is aborted. Emails sent before are
+        marked as sent, the rest stay leased until their lease expires.
+        """
+        for subject in ['fast', 'fast', 'slow', 'fast']:
+            Email.objects.create(
+                to=['to@example.com'], from_email='bob@example.com', subject=subject, status=STATUS.queued
+            )
+        emails = claim_queued()
+        with self.assertRaises(TimeoutError):
+            _send_bulk(emails, uses_multiprocessing=False)
+        self.assertEqual(
+            sorted(Email.objects.values_list('subject', 'status')),
+            [('fast', STATUS.sent), ('fast', STATUS.sent), ('fast', STATUS.sending), ('slow', STATUS.requeued)],
+        )
+
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {'default': {'BACKEND': 'tests.test_mail.BatchRecordingBackend', 'CHUNK_SIZE': 2}},
+            'THREADS_PER_PROCESS': 1,
+            'MAX_RETRIES': 0,
+        }
+    )
+    def test_send_bulk_send_batch_result_mismatch(self):
+        """
+        If send_batch() doesn't return a result per message, all emails of the chunk are failed.
+        """
+        emails = Email.objects.bulk_create(
+            [Email(to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued) for _ in range(2)]
+        )
+        with patch.object(BatchRecordingBackend, 'send_batch', return_value=[SendResult()]):
+            self.assertEqual(_send_bulk(emails, uses_multiprocessing=False), (0, 2, 0))
+        self.assertEqual(Log.objects.filter(exception_type='ValueError').count(), 2)
+
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {'default': 'tests.test_mail.ConnectionTestingBackend'},
+            'BATCH_SIZE': 1,
+            'THREADS_PER_PROCESS': 1,
+            'PERSISTENT_WORKERS': True,
+        },
+    )
+    def test_persistent_workers_reuse_connections_across_batches(self):
+        """
+        With PERSISTENT_WORKERS, sending threads and their connections outlive a batch,
+        and are closed once the run is done.
+        """
+        global connection_counter, closed_connection_counter
+        connection_counter, closed_connection_counter = 0, 0
+        Email.objects.bulk_create(
+            [Email(to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued) for _ in range(3)]
+        )
+        send_queued_mail_until_done(lockfile='/tmp/post_office_test_lockfile')
+        self.assertEqual(Email.objects.filter(status=STATUS.sent).count(), 3)
+        # One connection opened while preparing and one in the sending thread, for all three batches
+        self.assertEqual(connection_counter, 2)
+        self.assertEqual(closed_connection_counter, 2)
+        connection_counter, closed_connection_counter = 0, 0
+
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {'default': 'django.core.mail.backends.dummy.EmailBackend'},
+            'BATCH_SIZE': 2,
+            'PERSISTENT_WORKERS': True,
+        },
+    )
+    def test_persistent_workers_multi_processes(self):
+        """
+        With PERSISTENT_WORKERS, worker processes are started once for the whole run.
+        """
+        Email.objects.bulk_create(
+            [Email(to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued) for _ in range(6)]
+        )
+        with patch('post_office.mail.multiprocessing.get_context', wraps=multiprocessing.get_context) as get_context:
+            send_queued_mail_until_done(lockfile='/tmp/post_office_test_lockfile', processes=2)
+        self.assertEqual(get_context.call_count, 1)
+        # Workers update their own copy of the in-memory test database,
+        # so only check that every batch was claimed
+        self.assertFalse(Email.objects.filter(status__in=[STATUS.queued, STATUS.requeued]).exists())
+
     def test_get_queued(self):
         """
         Ensure get_queued returns only emails that should be sent
@@ -206,6 +524,248 @@ class MailTest(TransactionTestCase):
         )
         self.assertEqual(list(get_queued()), [queued_email, past_email])
 
+    def test_claim_queued(self):
+        """
+        claim_queued() marks the emails it returns as sending and leases them.
+        """
+        queued_email = Email.objects.create(
+            to=['to@example.com'], from_email='bob@example.com', subject='Test', status=STATUS.queued
+        )
+        Email.objects.create(to=['to@example.com'], from_email='bob@example.com', subject='Test', status=STATUS.sent)
+
+        emails = claim_queued()
+        self.assertEqual(emails, [queued_email])
+        queued_email.refresh_from_db()
+        self.assertEqual(queued_email.status, STATUS.sending)
+        self.assertTrue(queued_email.lease_owner)
+        self.assertGreater(queued_email.lease_expires_at, timezone.now())
+
+        # Claimed emails are not claimed again
+        self.assertEqual(claim_queued(), [])
+        self.assertEqual(list(get_queued()), [])
+
+        _send_bulk(emails, uses_multiprocessing=False)
+        queued_email.refresh_from_db()
+        self.assertEqual(queued_email.status, STATUS.sent)
+        self.assertEqual(queued_email.lease_owner, '')
+        self.assertIsNone(queued_email.lease_expires_at)
+
+    def test_claim_queued_skips_emails_claimed_concurrently(self):
+        """
+        Emails claimed by another worker between selecting and leasing are not returned.
+        """
+        email = Email.objects.create(
+            to=['to@example.com'], from_email='bob@example.com', subject='Test', status=STATUS.queued
+        )
+        queryset = get_queued()
+        Email.objects.filter(id=email.id).update(status=STATUS.sending, lease_owner='other-worker')
+        with patch('post_office.mail.get_queued', return_value=queryset):
+            self.assertEqual(claim_queued(), [])
+        email.refresh_from_db()
+        self.assertEqual(email.lease_owner, 'other-worker')
+
+    @skipUnlessDBFeature('has_select_for_update_skip_locked')
+    def test_claim_queued_concurrently(self):
+        """
+        Workers claiming at the same time, each on its own connection, get disjoint batches.
+        """
+        Email.objects.bulk_create(
+            [Email(to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued) for _ in range(10)]
+        )
+        rows_locked = threading.Event()
+        other_worker_done = threading.Event()
+        claimed = {}
+
+        def get_lease_duration():
+            # Called while the first worker holds its row locks
+            if threading.current_thread().name == 'first':
+                rows_locked.set()
+                other_worker_done.wait(timeout=10)
+            return timedelta(minutes=10)
+
+        def claim(name):
+            try:
+                claimed[name] = {email.id for email in claim_queued(batch_size=5)}
+            finally:
+                db_connection.close()
+                if name == 'second':
+                    other_worker_done.set()
+
+        with patch('post_office.mail.get_lease_duration', side_effect=get_lease_duration):
+            first = threading.Thread(target=claim, args=('first',), name='first')
+            first.start()
+            self.assertTrue(rows_locked.wait(timeout=10))
+            second = threading.Thread(target=claim, args=('second',), name='second')
+            second.start()
+            second.join()
+            first.join()
+
+        self.assertEqual(len(claimed['first']), 5)
+        self.assertEqual(len(claimed['second']), 5)
+        self.assertFalse(claimed['first'] & claimed['second'])
+
+    def test_lock_rows(self):
+        """
+        Rows are locked with SKIP LOCKED where supported.
+        """
+        features = db_connection.features
+        with patch.object(features, 'has_select_for_update', True):
+            with patch.object(features, 'has_select_for_update_skip_locked', True):
+                queryset = _lock_rows(get_queued())
+            self.assertTrue(queryset.query.select_for_update)
+            self.assertTrue(queryset.query.select_for_update_skip_locked)
+
+            with patch.object(features, 'has_select_for_update_skip_locked', False):
+                queryset = _lock_rows(get_queued())
+            self.assertTrue(queryset.query.select_for_update)
+            self.assertFalse(queryset.query.select_for_update_skip_locked)
+
+        with patch.object(features, 'has_select_for_update', False):
+            queryset = _lock_rows(get_queued())
+        self.assertFalse(queryset.query.select_for_update)
+
+    def test_requeue_expired_leases(self):
+        """
+        Emails whose lease expired are requeued, emails with valid leases are left alone.
+        """
+        kwargs = {'to': ['to@example.com'], 'from_email': 'bob@example.com', 'status': STATUS.sending}
+        expired_email = Email.objects.create(
+            lease_owner='dead-worker', lease_expires_at=timezone.now() - timedelta(minutes=1), **kwargs
+        )
+        leased_email = Email.objects.create(
+            lease_owner='live-worker', lease_expires_at=timezone.now() + timedelta(minutes=1), **kwargs
+        )
+
+        self.assertEqual(requeue_expired_leases(), 1)
+        expired_email.refresh_from_db()
+        self.assertEqual(expired_email.status, STATUS.requeued)
+        self.assertEqual(expired_email.number_of_retries, 1)
+        self.assertEqual(expired_email.lease_owner, '')
+        self.assertIsNone(expired_email.lease_expires_at)
+        leased_email.refresh_from_db()
+        self.assertEqual(leased_email.status, STATUS.sending)
+
+        # Requeued emails are picked up by the next run
+        self.assertEqual(send_queued(), (1, 0, 0))
+
+    def test_requeue_expired_leases_counts_retries(self):
+        """
+        An expired lease counts as a retry, emails out of retries are marked as failed.
+        """
+        email = Email.objects.create(
+            to=['to@example.com'],
+            from_email='bob@example.com',
+            status=STATUS.sending,
+            number_of_retries=get_max_retries(),
+            lease_owner='dead-worker',
+            lease_expires_at=timezone.now() - timedelta(minutes=1),
+        )
+        self.assertEqual(requeue_expired_leases(), 0)
+        email.refresh_from_db()
+        self.assertEqual(email.status, STATUS.failed)
+        self.assertEqual(email.lease_owner, '')
+
+    def test_claim_queued_priorities(self):
+        """
+        Priority lanes only claim emails with their priorities.
+        """
+        for priority in [PRIORITY.low, PRIORITY.medium, PRIORITY.high]:
+            Email.objects.create(
+                to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued, priority=priority
+            )
+        self.assertEqual([email.priority for email in claim_queued(priorities=[PRIORITY.high])], [PRIORITY.high])
+        self.assertEqual(
+            sorted(email.priority for email in claim_queued(priorities=[PRIORITY.low, PRIORITY.medium])),
+            [PRIORITY.low, PRIORITY.medium],
+        )
+        self.assertEqual(claim_queued(priorities=[PRIORITY.high]), [])
+
+    def test_send_bulk_renews_leases(self):
+        """
+        Leases of emails that are still being sent are renewed while the batch is sent.
+        """
+        for _ in range(2):
+            Email.objects.create(to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued)
+        emails = claim_queued()
+        expires_at = timezone.now() + timedelta(seconds=1)
+        Email.objects.update(lease_expires_at=expires_at)
+
+        renewed = []
+        prepare_email_message = Email.prepare_email_message
+
+        def prepare(email):
+            # Emails are prepared in this thread, right after leases are renewed
+            renewed.append(Email.objects.get(id=email.id).lease_expires_at > expires_at)
+            return prepare_email_message(email)
+
+        # Not longer than BATCH_DELIVERY_TIMEOUT, so leases are renewed for every email
+        with override_settings(POST_OFFICE={**settings.POST_OFFICE, 'LEASE_DURATION': timedelta(seconds=2)}):
+            with patch.object(Email, 'prepare_email_message', autospec=True, side_effect=prepare):
+                with patch('post_office.mail._send_email', return_value=(True, None)):
+                    self.assertEqual(_send_bulk(emails, uses_multiprocessing=False), (2, 0, 0))
+        self.assertIn(True, renewed)
+
+    def test_send_bulk_leaves_lost_leases_alone(self):
+        """
+        Emails whose lease expired and were claimed by another worker while being sent
+        keep the status set by the other worker.
+        """
+        Email.objects.create(to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued)
+        emails = claim_queued()
+        Email.objects.update(lease_owner='other-worker')
+
+        _send_bulk(emails, uses_multiprocessing=False)
+        email = Email.objects.get()
+        self.assertEqual(email.status, STATUS.sending)
+        self.assertEqual(email.lease_owner, 'other-worker')
+
+    @override_settings(POST_OFFICE={**settings.POST_OFFICE, 'LEASE_DURATION': timedelta(seconds=1)})
+    def test_lease_duration_must_exceed_batch_delivery_timeout(self):
+        with self.assertRaises(ImproperlyConfigured):
+            send_queued_mail_until_done(lockfile='/tmp/post_office_test_lockfile')
+
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {'default': 'django.core.mail.backends.locmem.EmailBackend'},
+            'BATCH_SIZE': 1,
+            'ROW_LOCKING_ENABLED': True,
+        }
+    )
+    def test_send_queued_mail_until_done_with_row_locking(self):
+        """
+        With row locking, emails are claimed batch by batch and no file lock is acquired.
+        """
+        for _ in range(3):
+            Email.objects.create(
+                to=['to@example.com'], from_email='bob@example.com', subject='Test', status=STATUS.queued
+            )
+        with patch('post_office.mail.supports_row_locking', return_value=True):
+            with patch('post_office.mail.FileLock') as file_lock:
+                send_queued_mail_until_done(lockfile='/tmp/post_office_test_lockfile')
+        file_lock.assert_not_called()
+        self.assertEqual(Email.objects.filter(status=STATUS.sent).count(), 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+    @override_settings(POST_OFFICE={'ROW_LOCKING_ENABLED': True})
+    def test_row_locking_doesnt_start_processes_for_empty_queue(self):
+        """
+        With row locking, no processes are started when there's nothing to claim.
+        """
+        with patch('post_office.mail.supports_row_locking', return_value=True):
+            with patch('post_office.mail._run_in_processes') as run_in_processes:
+                self.assertEqual(send_queued(processes=2), (0, 0, 0))
+        run_in_processes.assert_not_called()
+
+    @override_settings(POST_OFFICE={'ROW_LOCKING_ENABLED': True})
+    def test_row_locking_falls_back_without_select_for_update(self):
+        """
+        Row locking is only used when the database supports SELECT ... FOR UPDATE.
+        """
+        with patch.object(db_connection.features, 'has_select_for_update', False):
+            self.assertFalse(supports_row_locking())
+        with patch.object(db_connection.features, 'has_select_for_update', True):
+            self.assertTrue(supports_row_locking())
+
     def test_attach_templates(self):
         """
         Ensure templates are loaded efficiently when multiple emails share the same template.
@@ -311,6 +871,37 @@ class MailTest(TransactionTestCase):
         send_many(kwargs_list)
         self.assertEqual(Email.objects.filter(to=['a@example.com']).count(), 1)
 
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {'default': 'django.core.mail.backends.locmem.EmailBackend'},
+            'DEDUPLICATE_BODIES': True,
+        }
+    )
+    def test_send_many_deduplicates_bodies(self):
+        kwargs_list = [
+            {
+                'sender': 'from@example.com',
+                'recipients': [f'{i}@example.com'],
+                'subject': 'Newsletter',
+                'message': 'Text' if i < 3 else 'Other text',
+                'html_message': '<p>HTML</p>',
+            }
+            for i in range(4)
+        ]
+        send_many(kwargs_list)
+        send(sender='from@example.com', recipients=['4@example.com'], message='Text', html_message='<p>HTML</p>')
+        self.assertEqual(EmailBody.objects.count(), 2)
+        self.assertFalse(Email.objects.exclude(message='', html_message='').exists())
+        self.assertEqual(Email.objects.filter(body__message='Text').count(), 4)
+
+        # Bodies are loaded once per batch
+        with patch('post_office.mail.EmailBody.objects.in_bulk', wraps=EmailBody.objects.in_bulk) as in_bulk:
+            self.assertEqual(send_queued(), (5, 0, 0))
+        in_bulk.assert_called_once()
+        self.assertEqual(mail.outbox[0].body, 'Text')
+        self.assertEqual(mail.outbox[0].alternatives[0][0], '<p>HTML</p>')
+        self.assertEqual(sorted(message.body for message in mail.outbox), ['Other text'] + ['Text'] * 4)
+
     def test_send_with_attachments(self):
         attachments = {
             'attachment_file1.txt': ContentFile('content'),
@@ -540,6 +1131,37 @@ class MailTest(TransactionTestCase):
             self.assertEqual(email.number_of_retries, 2)
             self.assertEqual(email.scheduled_time, timezone.datetime(2020, 5, 18, 8, 30, 1))
 
+    def test_retry_backoff(self):
+        """
+        Emails that failed together are retried later with every attempt, and spread out by RETRY_JITTER.
+        """
+        emails = Email.objects.bulk_create(
+            [
+                Email(to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued, backend_alias='error')
+                for _ in range(10)
+            ]
+        )
+        Email.objects.filter(id=emails[0].id).update(number_of_retries=1)
+        config = {
+            **settings.POST_OFFICE,
+            'MAX_RETRIES': 5,
+            'RETRY_INTERVAL': timedelta(minutes=10),
+            'RETRY_BACKOFF': 3,
+            'RETRY_JITTER': 0.5,
+        }
+        now = timezone.now()
+        with override_settings(POST_OFFICE=config):
+            with patch('django.utils.timezone.now', return_value=now):
+                self.assertEqual(send_queued(), (0, 0, 10))
+
+        retried_once = Email.objects.filter(number_of_retries=1)
+        delays = {email.scheduled_time - now for email in retried_once}
+        self.assertGreater(len(delays), 1)
+        self.assertTrue(all(timedelta(minutes=5) <= delay <= timedelta(minutes=10) for delay in delays))
+        retried_twice = Email.objects.get(number_of_retries=2)
+        self.assertGreaterEqual(retried_twice.scheduled_time - now, timedelta(minutes=15))
+
+
     @override_settings(USE_TZ=True)
     def test_expired(self):
         tzinfo = ZoneInfo('Asia/Jakarta')
@@ -584,11 +1206,11 @@ class MailTest(TransactionTestCase):
                 expires_at=timezone.datetime(2020, 5, 18, 9, 0, 0),
             )
 
-    def test_batch_delivery_timeout(self):
+    def test_send_timeout(self):
         """
-        Ensure that batch delivery timeout is respected.
+        Ensure that the send timeout is respected, emails whose send timed out are requeued.
         """
-        _ = Email.objects.create(
+        email = Email.objects.create(
             to=['to@example.com'],
             from_email='bob@example.com',
             subject='',
@@ -597,13 +1219,79 @@ class MailTest(TransactionTestCase):
             backend_alias='slow_backend',
         )
         start_time = timezone.now()
-        # slow backend sleeps for 5 seconds, so we should get a timeout error since we set
-        # BATCH_DELIVERY_TIMEOUT timeout to 2 seconds in this test
-        with self.assertRaises(TimeoutError):
-            send_queued()
+        # slow backend sleeps for 5 seconds, so the send times out since SEND_TIMEOUT
+        # defaults to BATCH_DELIVERY_TIMEOUT, which is 2 seconds in this test
+        self.assertEqual(send_queued(), (0, 0, 1))
         end_time = timezone.now()
         # Assert that running time is less than 3 seconds (2 seconds timeout + 1 second buffer)
         self.assertTrue(end_time - start_time < timezone.timedelta(seconds=3))
+        email.refresh_from_db()
+        self.assertEqual(email.status, STATUS.requeued)
+        self.assertEqual(email.logs.get().exception_type, 'TimeoutError')
+
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {'default': 'tests.test_mail.SlowSubjectBackend'},
+            'THREADS_PER_PROCESS': 2,
+            'SEND_TIMEOUT': 1,
+            'MAX_RETRIES': 1,
+        }
+    )
+    def test_send_timeout_completes_batch(self):
+        """
+        A send that hangs is failed while the rest of the batch is sent, and its connection is discarded.
+        """
+        emails = Email.objects.bulk_create(
+            [
+                Email(to=['to@example.com'], from_email='bob@example.com', subject=subject, status=STATUS.queued)
+                for subject in ['slow', 'fast', 'fast', 'fast']
+            ]
+        )
+        with patch('post_office.mail.connections.discard', wraps=connections.discard) as discard:
+            self.assertEqual(_send_bulk(emails, uses_multiprocessing=False), (3, 0, 1))
+            self.assertEqual(
+                sorted(Email.objects.values_list('subject', 'status')),
+                [('fast', STATUS.sent), ('fast', STATUS.sent), ('fast', STATUS.sent), ('slow', STATUS.requeued)],
+            )
+            # Once the hung send returns
+            for _ in range(50):
+                if call('default') in discard.call_args_list:
+                    break
+                time.sleep(0.1)
+        discard.assert_any_call('default')
+
+    def test_send_timeout_replaces_persistent_threads(self):
+        """
+        Threads stuck on a send that timed out aren't reused for the next batch.
+        """
+        from post_office import mail as mail_module
+
+        email = Email.objects.create(
+            to=['to@example.com'],
+            from_email='bob@example.com',
+            status=STATUS.queued,
+            backend_alias='slow_backend',
+        )
+        thread_pool, _ = mail_module._get_thread_pool()
+        self.assertEqual(_send_bulk([email], uses_multiprocessing=False, persistent=True), (0, 0, 1))
+        self.assertIsNone(mail_module._thread_pool)
+        self.assertIsNot(mail_module._get_thread_pool()[0], thread_pool)
+        mail_module._close_thread_pool()
+
+    @override_settings(POST_OFFICE={'BATCH_DELIVERY_TIMEOUT': 0.5})
+    def test_process_timeout_keeps_other_results(self):
+        """
+        A process that doesn't finish its batch in time counts as nothing sent, the other results are kept.
+        """
+
+        def send_batch(delay):
+            time.sleep(delay)
+            return (1, 0, 0)
+
+        with multiprocessing.pool.ThreadPool(2) as pool:
+            self.assertEqual(
+                _apply_in_pool_until_timeout(pool, send_batch, [(0,), (2,)]), ([(1, 0, 0), (0, 0, 0)], 1)
+            )
 
     def test_send_bulk_closes_connections_on_exception(self):
         """
@@ -638,6 +1326,67 @@ class MailTest(TransactionTestCase):
                     send_queued_mail_until_done(lockfile='/tmp/post_office_test_lockfile')
                 mock_close.assert_called()
 
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {'default': 'django.core.mail.backends.locmem.EmailBackend'},
+            'MIN_POLL_INTERVAL': 0.01,
+            'MAX_POLL_INTERVAL': 0.05,
+        }
+    )
+    def test_send_queued_mail_forever(self):
+        """
+        send_queued_mail_forever() keeps picking up newly queued emails until stopped.
+        """
+        stop_event = threading.Event()
+        thread = threading.Thread(
+            target=send_queued_mail_forever,
+            kwargs={'lockfile': '/tmp/post_office_test_lockfile', 'stop_event': stop_event},
+        )
+        thread.start()
+        try:
+            email = Email.objects.create(
+                to=['to@example.com'], from_email='bob@example.com', subject='Test', status=STATUS.queued
+            )
+            deadline = time.monotonic() + 5
+            while Email.objects.get(id=email.id).status != STATUS.sent and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(Email.objects.get(id=email.id).status, STATUS.sent)
+        finally:
+            stop_event.set()
+            thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+
+    @override_settings(POST_OFFICE={'MIN_POLL_INTERVAL': 0.1, 'MAX_POLL_INTERVAL': 0.3})
+    def test_send_queued_mail_forever_backoff(self):
+        """
+        Polling backs off exponentially while the queue is empty and resets once emails are sent.
+        """
+        stop_event = threading.Event()
+        intervals = []
+
+        def wait(interval):
+            intervals.append(interval)
+            if len(intervals) == 4:
+                stop_event.set()
+
+        results = [(1, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 1, 0), (0, 0, 0)]
+        with patch('post_office.mail.send_queued', side_effect=results):
+            with patch.object(stop_event, 'wait', side_effect=wait):
+                send_queued_mail_forever(lockfile='/tmp/post_office_test_lockfile', stop_event=stop_event)
+        self.assertEqual(intervals, [0.1, 0.2, 0.3, 0.1])
+
+    def test_send_queued_mail_forever_stops_on_sigterm(self):
+        """
+        SIGTERM stops the daemon after the current batch and the previous handler is restored.
+        """
+        previous_handler = signal.getsignal(signal.SIGTERM)
+        timer = threading.Timer(0.2, os.kill, args=(os.getpid(), signal.SIGTERM))
+        timer.start()
+        start_time = time.monotonic()
+        send_queued_mail_forever(lockfile='/tmp/post_office_test_lockfile')
+        self.assertLess(time.monotonic() - start_time, 3)
+        self.assertEqual(signal.getsignal(signal.SIGTERM), previous_handler)
+
     @patch('post_office.signals.email_queued.send')
     def test_backend_signal(self, mock):
         """
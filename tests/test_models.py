@@ -1,7 +1,7 @@
 import json
 import os
 from datetime import datetime, timedelta
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 from django.conf import settings as django_settings, settings
 from django.core import mail
@@ -14,8 +14,9 @@ from django.test.utils import override_settings
 from django.utils import timezone
 from django.core.mail.backends.locmem import EmailBackend as LocMemEmailBackend
 
-from post_office.models import Email, Log, PRIORITY, STATUS, EmailTemplate, Attachment
-from post_office.mail import send
+from post_office.models import Email, Log, PRIORITY, STATUS, EmailTemplate, Attachment, Recipient
+from post_office.mail import send, send_many
+from post_office.utils import send_mail
 
 
 class ModelTest(TestCase):
@@ -368,6 +369,26 @@ class ModelTest(TestCase):
 
         self.assertEqual(message.attachments, [('test.txt', 'test file content', 'text/plain')])
 
+    def test_attachments_are_read_when_sent(self):
+        email = Email.objects.create(
+            to=['to@example.com'], from_email='from@example.com', subject='Subject', backend_alias='locmem'
+        )
+        attachment = Attachment(mimetype='application/pdf')
+        attachment.file.save('test.pdf', content=ContentFile(b'%PDF-1.4 content'), save=True)
+        email.attachments.add(attachment)
+
+        with patch.object(Attachment.file.field.storage, 'open', wraps=attachment.file.storage.open) as open_file:
+            message = email.email_message()
+            open_file.assert_not_called()
+            filename, content, mimetype = message.attachments[0]
+            open_file.assert_called_once()
+        self.assertEqual((filename, content, mimetype), ('test.pdf', b'%PDF-1.4 content', 'application/pdf'))
+
+        email.dispatch()
+        [part] = [part for part in mail.outbox[0].message().walk() if part.get_filename()]
+        self.assertEqual(part.get_filename(), 'test.pdf')
+        self.assertEqual(part.get_payload(decode=True), b'%PDF-1.4 content')
+
     def test_translated_template_uses_default_templates_name(self):
         template = EmailTemplate.objects.create(name='name')
         id_template = template.translated_templates.create(language='id')
@@ -392,3 +413,57 @@ class ModelTest(TestCase):
         deserialized_objects = serializers.deserialize('json', data, use_natural_primary_keys=True)
         list(deserialized_objects)[0].save()
         self.assertEqual(EmailTemplate.objects.count(), 1)
+
+    def test_queued_index_matches_get_queued(self):
+        """
+        The partial index covers exactly the statuses get_queued() selects,
+        otherwise the database can't use it for get_queued().
+        """
+        from post_office.mail import get_queued
+
+        for status in STATUS:
+            Email.objects.create(to=['to@example.com'], from_email='from@example.com', status=status)
+
+        index = next(index for index in Email._meta.indexes if index.name == 'post_office_email_queued_idx')
+        indexed_statuses = set(Email.objects.filter(index.condition).values_list('status', flat=True))
+        queued_statuses = {email.status for email in get_queued(batch_size=len(STATUS))}
+        self.assertEqual(indexed_statuses, queued_statuses)
+
+
+@override_settings(POST_OFFICE={'STORE_RECIPIENTS': True})
+class RecipientTest(TestCase):
+    def test_for_email(self):
+        email = Email(
+            to=['Alice <Alice@Example.com>', 'bob@example.com'],
+            cc=['carol@example.com', 'bob@example.com'],
+            bcc=['dave@example.com'],
+        )
+        self.assertEqual(
+            [(recipient.address, recipient.kind) for recipient in Recipient.for_email(email)],
+            [
+                ('alice@example.com', Recipient.Kind.TO),
+                ('bob@example.com', Recipient.Kind.TO),
+                ('carol@example.com', Recipient.Kind.CC),
+                ('dave@example.com', Recipient.Kind.BCC),
+            ],
+        )
+
+    def test_stored_for_new_emails(self):
+        email = send(['to@example.com'], 'from@example.com', cc=['cc@example.com'])
+        self.assertEqual(
+            sorted(email.recipients.values_list('address', flat=True)), ['cc@example.com', 'to@example.com']
+        )
+
+        emails = send_many(
+            [{'sender': 'from@example.com', 'recipients': [f'{i}@example.com']} for i in range(3)]
+        )
+        for i, email in enumerate(emails):
+            self.assertEqual(Recipient.objects.get(address=f'{i}@example.com').email, email)
+
+        emails = send_mail('Subject', 'Message', 'from@example.com', ['a@example.com', 'b@example.com'])
+        self.assertEqual(Email.objects.filter(recipients__address='b@example.com').get(), emails[1])
+
+    @override_settings(POST_OFFICE={})
+    def test_disabled_by_default(self):
+        send(['to@example.com'], 'from@example.com')
+        self.assertFalse(Recipient.objects.exists())
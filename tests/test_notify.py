@@ -0,0 +1,96 @@
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase
+from django.test.utils import override_settings
+
+from post_office.mail import send_queued_mail_forever
+from post_office.models import Email
+from post_office.notify import QueueListener, get_queue_listener, notify_email_queued
+
+
+class NotifyTest(TransactionTestCase):
+    def test_notify_is_noop_on_other_databases(self):
+        """
+        Without PostgreSQL, queuing emails doesn't issue any query.
+        """
+        if connection.vendor == 'postgresql':
+            self.skipTest('Test for databases without LISTEN/NOTIFY')
+        with self.assertNumQueries(0):
+            notify_email_queued(sender=Email, emails=[])
+
+    @override_settings(POST_OFFICE={'NOTIFY_ENABLED': True})
+    def test_get_queue_listener(self):
+        if connection.vendor == 'postgresql':
+            self.skipTest('Test for databases without LISTEN/NOTIFY')
+        self.assertIsNone(get_queue_listener())
+
+    @override_settings(POST_OFFICE={'MIN_POLL_INTERVAL': 0.1, 'MAX_POLL_INTERVAL': 0.3})
+    def test_daemon_wakes_up_on_notification(self):
+        """
+        The daemon waits on the listener instead of sleeping, and polls
+        again right away when it's woken up.
+        """
+        stop_event = threading.Event()
+        intervals = []
+
+        def wait(interval):
+            intervals.append(interval)
+            if len(intervals) == 4:
+                stop_event.set()
+            # Emails are queued during the second wait
+            return len(intervals) == 2
+
+        listener = MagicMock(wait=MagicMock(side_effect=wait))
+        with patch('post_office.mail.get_queue_listener', return_value=listener):
+            with patch('post_office.mail.send_queued', return_value=(0, 0, 0)):
+                send_queued_mail_forever(lockfile='/tmp/post_office_test_lockfile', stop_event=stop_event)
+        self.assertEqual(intervals, [0.1, 0.2, 0.1, 0.2])
+        listener.close.assert_called_once()
+
+    @override_settings(POST_OFFICE={'MIN_POLL_INTERVAL': 0.1, 'MAX_POLL_INTERVAL': 0.2, 'NOTIFY_POLL_INTERVAL': 0.8})
+    def test_daemon_polls_less_often_while_listening(self):
+        stop_event = threading.Event()
+        intervals = []
+
+        def wait(interval):
+            intervals.append(interval)
+            if len(intervals) == 5:
+                stop_event.set()
+            return False
+
+        listener = MagicMock(wait=MagicMock(side_effect=wait))
+        with patch('post_office.mail.get_queue_listener', return_value=listener):
+            with patch('post_office.mail.send_queued', return_value=(0, 0, 0)):
+                send_queued_mail_forever(lockfile='/tmp/post_office_test_lockfile', stop_event=stop_event)
+        self.assertEqual(intervals, [0.1, 0.2, 0.4, 0.8, 0.8])
+
+    @override_settings(POST_OFFICE={'NOTIFY_ENABLED': True, 'MIN_POLL_INTERVAL': 0.01})
+    def test_daemon_reconnects_listener(self):
+        """
+        When the listener's connection is lost, the daemon keeps polling and listens again.
+        """
+        stop_event = threading.Event()
+        broken_listener = MagicMock(wait=MagicMock(side_effect=OperationalError('server closed the connection')))
+        listener = MagicMock(wait=MagicMock(side_effect=lambda interval: stop_event.set()))
+
+        with patch('post_office.mail.get_queue_listener', side_effect=[broken_listener, listener]) as get_listener:
+            with patch('post_office.mail.send_queued', return_value=(0, 0, 0)) as send_queued:
+                send_queued_mail_forever(lockfile='/tmp/post_office_test_lockfile', stop_event=stop_event)
+        self.assertEqual(get_listener.call_count, 2)
+        self.assertEqual(send_queued.call_count, 2)
+        broken_listener.close.assert_called_once()
+        listener.close.assert_called_once()
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Test for PostgreSQL')
+    @override_settings(POST_OFFICE={'NOTIFY_ENABLED': True})
+    def test_listener_receives_notifications(self):
+        listener = QueueListener()
+        try:
+            self.assertFalse(listener.wait(0.1))
+            notify_email_queued(sender=Email, emails=[])
+            self.assertTrue(listener.wait(5))
+        finally:
+            listener.close()
@@ -0,0 +1,91 @@
+import time
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import override_settings
+
+from post_office.mail import _send_bulk
+from post_office.models import STATUS, Email
+from post_office.ratelimit import SharedTokenBucket, TokenBucket, get_rate_limiter
+
+
+class TokenBucketTest(TestCase):
+    def test_reserve(self):
+        clock = MagicMock(monotonic=MagicMock(return_value=100.0))
+        with patch('post_office.ratelimit.time', clock):
+            bucket = TokenBucket(rate=2, burst=2)
+            # The burst is available right away
+            self.assertEqual(bucket.reserve(), 0)
+            self.assertEqual(bucket.reserve(), 0)
+            # Then a token is added every half second
+            self.assertEqual(bucket.reserve(), 0.5)
+            clock.monotonic.return_value = 100.25
+            self.assertEqual(bucket.reserve(), 0.25)
+            clock.monotonic.return_value = 100.5
+            self.assertEqual(bucket.reserve(), 0)
+            # Tokens don't pile up beyond the burst
+            clock.monotonic.return_value = 200
+            self.assertEqual([bucket.reserve() for _ in range(3)], [0, 0, 0.5])
+
+    def test_shared_reserve(self):
+        cache = caches['default']
+        clock = MagicMock(time=MagicMock(return_value=1000.0))
+        with patch('post_office.ratelimit.time', clock):
+            # Two processes sharing the same limit
+            buckets = [SharedTokenBucket('shared', rate=2, burst=2, cache=cache) for _ in range(2)]
+            self.assertEqual(buckets[0].reserve(), 0)
+            self.assertEqual(buckets[1].reserve(), 0)
+            self.assertEqual(buckets[0].reserve(), 1)
+            clock.time.return_value = 1001.5
+            self.assertEqual(buckets[1].reserve(), 0)
+        cache.clear()
+
+
+class RateLimiterTest(TransactionTestCase):
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {
+                'default': 'django.core.mail.backends.locmem.EmailBackend',
+                'limited': {'BACKEND': 'django.core.mail.backends.locmem.EmailBackend', 'RATE_LIMIT': 1},
+                'shared': {
+                    'BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+                    'RATE_LIMIT': 1,
+                    'RATE_LIMIT_SHARED': True,
+                },
+            }
+        }
+    )
+    def test_get_rate_limiter(self):
+        self.assertIsNone(get_rate_limiter('default'))
+        self.assertIsInstance(get_rate_limiter('limited'), TokenBucket)
+        # The same bucket is used by every thread
+        self.assertIs(get_rate_limiter('limited'), get_rate_limiter('limited'))
+        with patch('post_office.ratelimit.get_cache_backend', return_value=caches['default']):
+            self.assertIsInstance(get_rate_limiter('shared'), SharedTokenBucket)
+        with patch('post_office.ratelimit.get_cache_backend', return_value=None):
+            with patch('post_office.ratelimit._rate_limiters_pid', None):
+                with self.assertRaises(ImproperlyConfigured):
+                    get_rate_limiter('shared')
+
+    @override_settings(
+        POST_OFFICE={
+            'BACKENDS': {
+                'default': {
+                    'BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+                    'RATE_LIMIT': 20,
+                    'RATE_LIMIT_BURST': 1,
+                },
+            },
+            'THREADS_PER_PROCESS': 5,
+        }
+    )
+    def test_send_bulk_respects_rate_limit(self):
+        emails = Email.objects.bulk_create(
+            [Email(to=['to@example.com'], from_email='bob@example.com', status=STATUS.queued) for _ in range(5)]
+        )
+        start = time.monotonic()
+        self.assertEqual(_send_bulk(emails, uses_multiprocessing=False), (5, 0, 0))
+        # The first email is sent right away, the others every 50ms
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
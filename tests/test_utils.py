@@ -1,3 +1,6 @@
+from datetime import timedelta
+from unittest.mock import patch
+
 from django.core.files.base import ContentFile
 from django.core.exceptions import ValidationError
 
@@ -8,6 +11,7 @@ from post_office.models import Email, STATUS, PRIORITY, EmailTemplate, Attachmen
 from post_office.utils import (
     create_attachments,
     get_email_template,
+    get_retry_delay,
     parse_emails,
     parse_priority,
     send_mail,
@@ -169,6 +173,37 @@ class UtilsTest(TestCase):
         self.assertEqual(attachments[0].name, 'attachment_file.py')
         self.assertEqual(attachments[0].mimetype, '')
 
+    @override_settings(POST_OFFICE={'DEDUPLICATE_ATTACHMENTS': True})
+    def test_create_attachments_deduplicates_content(self):
+        attachment = create_attachments({'terms.txt': ContentFile('terms')})[0]
+        self.assertEqual(create_attachments({'terms.txt': ContentFile('terms')}), [attachment])
+        self.assertEqual(attachment.file.read(), b'terms')
+        # Same content but a different name, mimetype or headers
+        others = create_attachments(
+            {
+                'other.txt': ContentFile('terms'),
+                'terms.txt': {'file': ContentFile('terms'), 'mimetype': 'text/plain'},
+                'terms.csv': {'file': ContentFile('terms'), 'headers': {'Content-ID': 'terms'}},
+            }
+        )
+        self.assertNotIn(attachment, others)
+        self.assertEqual(Attachment.objects.count(), 4)
+
+    def test_create_attachments_not_deduplicated_by_default(self):
+        attachment = create_attachments({'terms.txt': ContentFile('terms')})[0]
+        self.assertNotEqual(create_attachments({'terms.txt': ContentFile('terms')}), [attachment])
+        self.assertEqual(attachment.content_hash, '')
+
+    def test_create_attachments_with_key(self):
+        attachment = create_attachments({'terms.txt': {'file': ContentFile('terms'), 'key': 'terms-v1'}})[0]
+        with patch('post_office.utils.open') as open_file:
+            attachments = create_attachments({'terms.txt': {'file': '/does/not/exist', 'key': 'terms-v1'}})
+        open_file.assert_not_called()
+        self.assertEqual(attachments, [attachment])
+        self.assertNotEqual(
+            create_attachments({'terms.txt': {'file': ContentFile('terms'), 'key': 'terms-v2'}}), [attachment]
+        )
+
     def test_parse_priority(self):
         self.assertEqual(parse_priority('now'), PRIORITY.now)
         self.assertEqual(parse_priority('high'), PRIORITY.high)
@@ -185,3 +220,26 @@ class UtilsTest(TestCase):
         # Raises ValidationError if email is invalid
         self.assertRaises(ValidationError, parse_emails, 'invalid_email')
         self.assertRaises(ValidationError, parse_emails, ['invalid_email', 'test@example.com'])
+
+    @override_settings(
+        POST_OFFICE={
+            'RETRY_INTERVAL': timedelta(minutes=1),
+            'RETRY_BACKOFF': 2,
+            'RETRY_MAX_INTERVAL': timedelta(minutes=5),
+        }
+    )
+    def test_get_retry_delay(self):
+        self.assertEqual(
+            [get_retry_delay(retries) for retries in range(1, 6)],
+            [timedelta(minutes=minutes) for minutes in [1, 2, 4, 5, 5]],
+        )
+
+    @override_settings(POST_OFFICE={'RETRY_INTERVAL': timedelta(minutes=10), 'RETRY_JITTER': 0.5})
+    def test_get_retry_delay_jitter(self):
+        with patch('post_office.utils.random.random', return_value=0):
+            self.assertEqual(get_retry_delay(1), timedelta(minutes=10))
+        with patch('post_office.utils.random.random', return_value=0.99):
+            self.assertEqual(get_retry_delay(1), timedelta(minutes=5.05))
+        delays = {get_retry_delay(1) for _ in range(20)}
+        self.assertGreater(len(delays), 1)
+        self.assertTrue(all(timedelta(minutes=5) <= delay <= timedelta(minutes=10) for delay in delays))
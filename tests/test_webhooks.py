@@ -1,9 +1,10 @@
 from django.test import TestCase, override_settings
 from django.utils import timezone
 
-from post_office.models import RecipientDeliveryStatus
+from post_office.mail import send
+from post_office.models import Recipient, RecipientDeliveryStatus
 from post_office.settings import get_webhook_config
-from post_office.webhooks.base import ESPEvent
+from post_office.webhooks.base import ESPEvent, get_emails_by_message_id, update_recipient_statuses
 
 
 class ESPEventTest(TestCase):
@@ -45,3 +46,62 @@ class WebhookConfigTest(TestCase):
         """Test getting configuration for a provider that isn't configured."""
         config = get_webhook_config('NON_EXISTENT')
         self.assertEqual(config, {})
+
+
+@override_settings(POST_OFFICE={'STORE_RECIPIENTS': True, 'MESSAGE_ID_ENABLED': True})
+class UpdateRecipientStatusesTest(TestCase):
+    def event(self, status, message_id, recipient='to@example.com'):
+        return ESPEvent(raw_event='event', delivery_status=status, recipient=recipient, message_id=message_id)
+
+    def test_update_recipient_statuses(self):
+        email = send(['to@example.com', 'other@example.com'], 'from@example.com', subject='Hi')
+        self.assertEqual(
+            update_recipient_statuses(
+                [
+                    self.event(RecipientDeliveryStatus.DELIVERED, email.message_id),
+                    # Matched without the angle brackets too
+                    self.event(RecipientDeliveryStatus.OPENED, email.message_id.strip('<>'), 'OTHER@example.com'),
+                    self.event(RecipientDeliveryStatus.DELIVERED, '<unknown@example.com>'),
+                ]
+            ),
+            2,
+        )
+        statuses = dict(email.recipients.values_list('address', 'delivery_status'))
+        self.assertEqual(
+            statuses,
+            {'to@example.com': RecipientDeliveryStatus.DELIVERED, 'other@example.com': RecipientDeliveryStatus.OPENED},
+        )
+
+        # A better status isn't overwritten
+        self.assertEqual(update_recipient_statuses([self.event(RecipientDeliveryStatus.ACCEPTED, email.message_id)]), 0)
+        self.assertEqual(
+            update_recipient_statuses([self.event(RecipientDeliveryStatus.CLICKED, email.message_id)]), 1
+        )
+        self.assertEqual(
+            Recipient.objects.get(address='to@example.com').delivery_status, RecipientDeliveryStatus.CLICKED
+        )
+
+    def test_matches_provider_message_id(self):
+        email = send(['to@example.com'], 'from@example.com', subject='Hi')
+        email.provider_message_id = 'provider-1'
+        email.save()
+        update_recipient_statuses([self.event(RecipientDeliveryStatus.HARD_BOUNCED, 'provider-1')])
+        self.assertEqual(email.recipients.get().delivery_status, RecipientDeliveryStatus.HARD_BOUNCED)
+
+
+@override_settings(POST_OFFICE={'MESSAGE_ID_ENABLED': True})
+class GetEmailsByMessageIdTest(TestCase):
+    def test_get_emails_by_message_id(self):
+        emails = [send(['to@example.com'], 'from@example.com', subject=str(i)) for i in range(3)]
+        emails[2].provider_message_id = 'provider-2'
+        emails[2].save()
+        message_ids = [emails[0].message_id, emails[1].message_id.strip('<>'), 'provider-2', '<unknown@example.com>']
+        with self.assertNumQueries(1):
+            resolved = get_emails_by_message_id(message_ids + [None])
+        self.assertEqual(
+            resolved, {message_ids[0]: emails[0], message_ids[1]: emails[1], 'provider-2': emails[2]}
+        )
+
+    def test_no_message_ids(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(get_emails_by_message_id([]), {})